@@ -6,7 +6,7 @@ Ingenious Irrigation â€” bulk ingest + active learning + (optional) train.
 What it does:
 1) INGEST:
    - Pulls new images from .\incoming\images and frames from videos in .\incoming\videos
-   - De-duplicates by SHA1
+   - De-duplicates by SHA1, then drops near-duplicates by perceptual hash
    - Drops everything into .\dataset\unlabeled
 
 2) SELECT (Active Learning):
@@ -27,22 +27,31 @@ You can run stages separately: --ingest, --select, --prep, --train, or --all
 
 from __future__ import annotations
 import argparse
+import csv
 import hashlib
 import json
 import os
 import random
 import shutil
+import sqlite3
 import sys
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Tuple, Dict
 
 import cv2
 import numpy as np
-import pandas as pd
 from PIL import Image
 from tqdm import tqdm
 
+try:
+    import fcntl  # POSIX only; used for reflink copies
+    _FICLONE = 0x40049409
+except Exception:  # Windows
+    fcntl = None
+
 # ---- Ultralytics (YOLOv8) ----
 try:
     from ultralytics import YOLO
@@ -68,6 +77,7 @@ YOLO_LABS = YOLO_OUT / "labels"
 RUNS_DIR = ROOT / "pipeline_runs"
 RUNS_DIR.mkdir(parents=True, exist_ok=True)
 LOG_CSV = RUNS_DIR / "log.csv"
+HASH_DB = RUNS_DIR / "hash_index.sqlite"
 
 # Your classes (index order matters)
 CLASSES = [
@@ -84,6 +94,17 @@ CLASSES = [
 IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv", ".m4v"}
 
+# images per YOLO forward pass in SELECT
+SELECT_BATCH = 16
+
+# baseline (non-progressive, no optimize pass) JPEG for extracted video frames
+FRAME_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85,
+                     cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+                     cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+
+# max Hamming distance between 64-bit dHashes to call two images near-duplicates
+PHASH_MAX_DISTANCE = 6
+
 # ---------------- UTILS ----------------
 
 
@@ -95,31 +116,117 @@ def sha1_of_file(p: Path) -> str:
     return h.hexdigest()
 
 
+def imread_path(p: Path, flags: int = cv2.IMREAD_COLOR) -> np.ndarray | None:
+    """cv2.imread that also handles non-ASCII paths on Windows. None if unreadable."""
+    try:
+        buf = np.fromfile(str(p), np.uint8)
+    except OSError:
+        return None
+    return cv2.imdecode(buf, flags) if buf.size else None
+
+
+def dhash_of_image(p: Path) -> int | None:
+    """64-bit difference hash; robust to re-encoding and resizing. None if unreadable."""
+    img = imread_path(p, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def min_hamming(known: np.ndarray, h: int) -> int:
+    """Smallest Hamming distance from h to any hash in `known` (uint64 array)."""
+    if known.size == 0:
+        return 64
+    x = np.bitwise_xor(known, np.uint64(h))
+    return int(np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1).min())
+
+
+def open_hash_index() -> sqlite3.Connection:
+    """Open (creating if needed) the ingest dedup index.
+
+    One row per accepted image: its SHA1, filename and dHash (hex). Indexes
+    from older runs (hash_index.json / phash_index.json) are imported once.
+    """
+    fresh = not HASH_DB.exists()
+    con = sqlite3.connect(HASH_DB)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("CREATE TABLE IF NOT EXISTS hashes ("
+                "sha1 TEXT PRIMARY KEY, filename TEXT NOT NULL, dhash TEXT)")
+    legacy = RUNS_DIR / "hash_index.json"
+    if fresh and legacy.exists():
+        legacy_ph = RUNS_DIR / "phash_index.json"
+        phashes = json.loads(legacy_ph.read_text()) if legacy_ph.exists() else {}
+        with con:
+            con.executemany("INSERT OR IGNORE INTO hashes VALUES (?, ?, ?)",
+                            [(h, name, phashes.get(name))
+                             for h, name in json.loads(legacy.read_text()).items()])
+    return con
+
+
 def ensure_dirs():
     for d in [INCOMING_IMG, INCOMING_VID, UNLABELED_DIR, TO_LABEL_DIR, AUTOLABELED_DIR, LABELED_DIR,
               YOLO_IMGS/"train", YOLO_IMGS/"val", YOLO_LABS/"train", YOLO_LABS/"val"]:
         d.mkdir(parents=True, exist_ok=True)
 
 
+def _reflink(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone (btrfs/xfs) via the FICLONE ioctl; False if unsupported."""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as fs, open(dst, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
 def safe_copy(src: Path, dst: Path):
+    """Materialise src at dst without moving bytes when the filesystem allows it.
+
+    Tries a hard link, then a reflink, then falls back to a real copy (e.g.
+    across devices or on filesystems without link support).
+    """
     dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        if os.path.samefile(src, dst):  # already linked by an earlier run
+            return
+        # replace rather than overwrite: dst may share its inode with another file
+        dst.unlink()
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    if _reflink(src, dst):
+        return
     shutil.copy2(src, dst)
 
 
 def write_yolo_labels(label_path: Path, boxes_xywhn: np.ndarray, cls_ids: np.ndarray):
     """boxes_xywhn: normalized [x,y,w,h], cls_ids: int"""
-    lines = []
-    for (x, y, w, h), c in zip(boxes_xywhn, cls_ids):
-        lines.append(f"{int(c)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}")
-    label_path.write_text("\n".join(lines))
+    out = np.column_stack([np.asarray(cls_ids, dtype=np.float64).reshape(-1),
+                           np.asarray(boxes_xywhn, dtype=np.float64).reshape(-1, 4)])
+    np.savetxt(label_path, out, fmt=["%d", "%.6f", "%.6f", "%.6f", "%.6f"])
+
+
+LOG_FIELDS = ["file", "route", "reason"]
 
 
 def save_log(rows: List[Dict]):
-    df = pd.DataFrame(rows)
-    if LOG_CSV.exists():
-        old = pd.read_csv(LOG_CSV)
-        df = pd.concat([old, df], ignore_index=True)
-    df.to_csv(LOG_CSV, index=False)
+    # append-only: never re-read the existing log
+    if not rows:
+        return
+    new_file = not LOG_CSV.exists()
+    with LOG_CSV.open("a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+        if new_file:
+            w.writeheader()
+        w.writerows(rows)
 
 
 def to_numpy(x):
@@ -148,16 +255,24 @@ def video_to_frames(video_path: Path, out_dir: Path, every_n_sec: float = 1.0):
     fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
     step = int(max(1, round(fps * every_n_sec)))
     count, saved = 0, 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if count % step == 0:
-            name = f"{video_path.stem}_f{count:06d}.jpg"
-            out = out_dir / name
-            cv2.imwrite(str(out), frame)
-            saved += 1
-        count += 1
+    # grab() advances without converting the frame; only kept frames are
+    # retrieved. JPEG encoding happens on a small writer pool, bounded so
+    # decoded frames can't pile up in memory.
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=4) as writers:
+        while cap.grab():
+            if count % step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    out = out_dir / f"{video_path.stem}_f{count:06d}.jpg"
+                    pending.append(writers.submit(cv2.imwrite, str(out), frame,
+                                                  FRAME_JPEG_PARAMS))
+                    saved += 1
+                    if len(pending) >= 32:
+                        pending.popleft().result()
+            count += 1
+        for fut in pending:
+            fut.result()
     cap.release()
     return saved
 
@@ -177,52 +292,160 @@ def stage_ingest() -> List[Path]:
         print(f"[INGEST] Extracted {frames_saved} frames from {vp.name}")
 
     # Copy images into unlabeled, skipping dupes by hash
-    seen_hashes = {}
-    hash_index_path = RUNS_DIR / "hash_index.json"
-    if hash_index_path.exists():
-        seen_hashes = json.loads(hash_index_path.read_text())
-
-    for ip in sorted(INCOMING_IMG.glob("*")):
-        if ip.suffix.lower() not in IMAGE_EXTS:
-            continue
-        h = sha1_of_file(ip)
-        if h in seen_hashes:
-            continue
-        dest = UNLABELED_DIR / ip.name
-        safe_copy(ip, dest)
-        seen_hashes[h] = dest.name
-        new_paths.append(dest)
-
-    hash_index_path.write_text(json.dumps(seen_hashes, indent=2))
+    con = open_hash_index()
+
+    def seen(h: str) -> bool:
+        return con.execute("SELECT 1 FROM hashes WHERE sha1 = ?", (h,)).fetchone() is not None
+
+    known = np.array([int(r[0], 16) for r in
+                      con.execute("SELECT dhash FROM hashes WHERE dhash IS NOT NULL")],
+                     dtype=np.uint64)
+
+    incoming = [ip for ip in sorted(INCOMING_IMG.glob("*"))
+                if ip.suffix.lower() in IMAGE_EXTS]
+    # hashlib releases the GIL while hashing, so threads scale across cores
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        digests = list(pool.map(sha1_of_file, incoming))
+        # exact-match SHA1 is the cheap first pass; only decode what survives it
+        fresh = [(ip, h) for ip, h in zip(incoming, digests)
+                 if not seen(h)]
+        dhashes = list(pool.map(dhash_of_image, [ip for ip, _ in fresh]))
+
+    near_dupes = 0
+    with con:
+        for (ip, h), ph in zip(fresh, dhashes):
+            if seen(h):  # same bytes earlier in this batch
+                continue
+            if ph is not None and min_hamming(known, ph) <= PHASH_MAX_DISTANCE:
+                near_dupes += 1
+                continue
+            dest = UNLABELED_DIR / ip.name
+            safe_copy(ip, dest)
+            con.execute("INSERT OR IGNORE INTO hashes (sha1, filename, dhash) VALUES (?, ?, ?)",
+                        (h, dest.name, None if ph is None else f"{ph:016x}"))
+            if ph is not None:
+                known = np.append(known, np.uint64(ph))
+            new_paths.append(dest)
+    con.close()
+
+    if near_dupes:
+        print(f"[INGEST] Skipped {near_dupes} near-duplicate images")
     print(f"[INGEST] New images moved to unlabeled: {len(new_paths)}")
     return new_paths
 
 # ---------------- 2) SELECT (Active Learning) ----------------
 
 
-def load_model(weights: Path | None):
+def tensorrt_engine(weights: Path, imgsz: int, batch: int) -> Path | None:
+    """Export `weights` to an FP16 TensorRT engine once and reuse it on later runs.
+
+    The engine is built with a dynamic batch profile up to `batch` and named
+    after imgsz/batch, so changing either builds a new one. Returns None if
+    export isn't possible (no TensorRT, unsupported GPU, ...).
+    """
+    engine = weights.with_name(f"{weights.stem}_{imgsz}_b{batch}.engine")
+    if engine.exists():
+        return engine
+    print(f"[MODEL] Exporting {weights.name} to TensorRT (one-time)...")
+    try:
+        out = YOLO(str(weights)).export(format="engine", half=True, imgsz=imgsz, batch=batch,
+                                        dynamic=True, workspace=4, verbose=False)
+        Path(out).replace(engine)
+        return engine
+    except Exception as e:
+        print(f"[MODEL] TensorRT export failed ({e!r}); using PyTorch weights")
+        return None
+
+
+def load_model(weights: Path | None, imgsz: int = 640, batch: int = SELECT_BATCH,
+               engine: bool = False):
     if weights and Path(weights).exists():
+        weights = Path(weights)
         print(f"[MODEL] Loading {weights}")
-        return YOLO(str(weights))
     else:
         print("[MODEL] Custom weights not found. Falling back to yolov8n.pt")
-        return YOLO("yolov8n.pt")
-
-
-def stage_select(model_path: Path | None, imgsz: int, conf_low: float, conf_high: float) -> Dict[str, int]:
+        weights = Path("yolov8n.pt")
+    if engine and weights.suffix == ".pt" and weights.exists() and cuda_available():
+        trt = tensorrt_engine(weights, imgsz, batch)
+        if trt is not None:
+            print(f"[MODEL] Using TensorRT engine {trt.name}")
+            return YOLO(str(trt), task="detect")
+    return YOLO(str(weights))
+
+
+def cuda_available() -> bool:
+    try:
+        import torch
+        return bool(torch.cuda.is_available())
+    except Exception:
+        return False
+
+
+def _predict_batched(model, paths: List[Path], imgsz: int, batch: int, half: bool = False):
+    """Yield (path, result) pairs, running YOLO on `batch` images per forward pass.
+
+    Images are decoded on a loader pool one chunk ahead, so disk reads and
+    JPEG decoding overlap the forward pass instead of running between them.
+    If a chunk fails part-way, the images not yet yielded are retried one by
+    one so a bad file only costs itself; per-image failures (including
+    unreadable files) are yielded as (path, exception).
+    """
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    with ThreadPoolExecutor(max_workers=workers) as loader:
+        def prefetch(start: int):
+            return [loader.submit(imread_path, p) for p in paths[start:start + batch]]
+
+        ahead = prefetch(0)
+        for i in range(0, len(paths), batch):
+            frames = [f.result() for f in ahead]
+            ahead = prefetch(i + batch)
+            chunk = []
+            for p, frame in zip(paths[i:i + batch], frames):
+                if frame is None:
+                    yield p, IOError(f"could not read image: {p.name}")
+                else:
+                    chunk.append((p, frame))
+            if not chunk:
+                continue
+            done = 0
+            try:
+                results = model.predict(source=[f for _, f in chunk], imgsz=imgsz,
+                                        conf=0.001, verbose=False, batch=batch, stream=True,
+                                        half=half)
+                for (p, _), res in zip(chunk, results):
+                    done += 1
+                    yield p, res
+                continue
+            except Exception:
+                pass
+            for p, frame in chunk[done:]:
+                try:
+                    yield p, model.predict(source=frame, imgsz=imgsz,
+                                           conf=0.001, verbose=False, half=half)[0]
+                except Exception as e:
+                    yield p, e
+
+
+def stage_select(model_path: Path | None, imgsz: int, conf_low: float, conf_high: float,
+                 batch: int = SELECT_BATCH, engine: bool = False) -> Dict[str, int]:
     ensure_dirs()
-    model = load_model(model_path)
+    batch = max(1, batch)
+    model = load_model(model_path, imgsz=imgsz, batch=batch, engine=engine)
     unlabeled = sorted([p for p in UNLABELED_DIR.glob("*")
                        if p.suffix.lower() in IMAGE_EXTS])
     stats = {"scanned": 0, "to_label": 0, "autolabeled": 0, "errors": 0}
     rows = []
 
-    for img in tqdm(unlabeled, desc="[SELECT] scoring"):
+    # FP16 on GPU: ~2x throughput, no meaningful accuracy change for detection
+    half = cuda_available()
+    if half:
+        print("[SELECT] CUDA available; running FP16 inference")
+    scored = _predict_batched(model, unlabeled, imgsz, batch, half=half)
+    for img, res in tqdm(scored, total=len(unlabeled), desc="[SELECT] scoring"):
         stats["scanned"] += 1
         try:
-            # Run prediction
-            res = model.predict(source=str(img), imgsz=imgsz,
-                                conf=0.001, verbose=False)[0]
+            if isinstance(res, Exception):
+                raise res
             det_count = 0 if res.boxes is None else res.boxes.shape[0]
 
             # If no detections -> needs human label
@@ -256,9 +479,11 @@ def stage_select(model_path: Path | None, imgsz: int, conf_low: float, conf_high
             mean_conf = float(confs.mean()) if len(confs) else 0.0
 
             # Ambiguity heuristic: small margin between top two confidences
-            sorted_confs = sorted(confs, reverse=True)
-            margin = sorted_confs[0] - \
-                (sorted_confs[1] if len(sorted_confs) > 1 else 0.0)
+            # (np.partition finds the runner-up in O(N), no full sort)
+            if confs.size >= 2:
+                margin = max_conf - float(np.partition(confs, confs.size - 2)[-2])
+            else:
+                margin = max_conf
 
             uncertain = (max_conf <= conf_low) or (
                 conf_low < max_conf <= conf_high) or (margin < 0.10)
@@ -297,16 +522,19 @@ def stage_select(model_path: Path | None, imgsz: int, conf_low: float, conf_high
 def stage_prep(val_split: float = 0.15) -> Tuple[int, int]:
     ensure_dirs()
 
-    # gather all labeled (human) + autolabeled
+    # gather all labeled (human) + autolabeled; one listing per dir, no per-file stat
     sources = []
     for d in [LABELED_DIR, AUTOLABELED_DIR]:
-        for img in d.glob("*"):
+        names = {e.name for e in os.scandir(d) if e.is_file()}
+        for name in names:
+            img = d / name
             if img.suffix.lower() not in IMAGE_EXTS:
                 continue
             txt = img.with_suffix(".txt")
-            if not txt.exists():
+            if txt.name not in names:
                 continue
             sources.append((img, txt))
+    sources.sort()  # scandir order is arbitrary; keep the shuffle seedable
 
     random.shuffle(sources)
     n_total = len(sources)
@@ -314,16 +542,17 @@ def stage_prep(val_split: float = 0.15) -> Tuple[int, int]:
 
     # clear current train/val
     for p in [YOLO_IMGS/"train", YOLO_IMGS/"val", YOLO_LABS/"train", YOLO_LABS/"val"]:
-        for f in p.glob("*"):
-            f.unlink()
+        shutil.rmtree(p, ignore_errors=True)
+        p.mkdir(parents=True, exist_ok=True)
 
-    # split+copy
+    # split+copy; safe_copy is mostly link() syscalls, so threads overlap them well
+    jobs = []
     for i, (img, lab) in enumerate(sources):
         split = "val" if i < n_val else "train"
-        dst_img = YOLO_IMGS/split/img.name
-        dst_lab = YOLO_LABS/split/lab.name
-        safe_copy(img, dst_img)
-        safe_copy(lab, dst_lab)
+        jobs.append((img, YOLO_IMGS/split/img.name))
+        jobs.append((lab, YOLO_LABS/split/lab.name))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda job: safe_copy(*job), jobs))
 
     print(f"[PREP] train: {max(0, n_total - n_val)}, val: {n_val}")
     return (max(0, n_total - n_val), n_val)
@@ -364,6 +593,10 @@ def main():
                     default="./data/hydration_data.yaml")
     ap.add_argument("--epochs", type=int, default=150)
     ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--batch_select", type=int, default=SELECT_BATCH,
+                    help="images per forward pass during selection")
+    ap.add_argument("--engine", action="store_true",
+                    help="export (once) and use a TensorRT engine for selection (CUDA only)")
     args = ap.parse_args()
 
     ensure_dirs()
@@ -371,14 +604,16 @@ def main():
     if args.all:
         stage_ingest()
         stage_select(Path(args.model), args.imgsz,
-                     args.conf_low, args.conf_high)
+                     args.conf_low, args.conf_high, batch=args.batch_select,
+                     engine=args.engine)
         stage_prep(args.val_split)
     else:
         if args.ingest:
             stage_ingest()
         if args.select:
             stage_select(Path(args.model), args.imgsz,
-                         args.conf_low, args.conf_high)
+                         args.conf_low, args.conf_high, batch=args.batch_select,
+                         engine=args.engine)
         if args.prep:
             stage_prep(args.val_split)
 
@@ -1,6 +1,9 @@
 # ai_brain.py — converts signals to watering minutes.
 # Signals expected shape:
 #   {"soil": 0.0..1.0, "tempF": 75, "rain_mm_24h": 0, "ai_flags":{"standing_water":False,"very_dry":False}}
+import numpy as np
+
+
 def decide_minutes_from_signals(base_minutes: int, s: dict) -> int:
     soil = float(s.get("soil", 0.4))        # lower is drier
     temp = float(s.get("tempF", 85))
@@ -28,3 +31,34 @@ def decide_minutes_from_signals(base_minutes: int, s: dict) -> int:
 
     # Clamp sane bounds
     return max(0, min(int(minutes), 45))
+
+
+# Batch form for scoring many zones (or replaying history) at once. Same rules
+# as above, written branch-free so each condition is a mask over the arrays.
+# numba is optional; without it the same expression runs as plain numpy.
+def _minutes_kernel(base, soil, temp, rain, standing):
+    minutes = base + 6 * (temp >= 93) + 3 * ((temp >= 88) & (temp < 93))
+    minutes = minutes + 6 * (soil <= 0.25) + 3 * ((soil > 0.25) & (soil <= 0.35)) \
+        - 5 * (soil >= 0.70)
+    light_rain = (rain >= 2) & (rain < 8)
+    minutes = np.where(light_rain, np.maximum(minutes - 5, 0), minutes)
+    minutes = np.minimum(np.maximum(minutes, 0), 45)
+    return np.where(standing | (rain >= 8), 0, minutes)
+
+
+try:
+    import numba
+    _minutes_kernel = numba.njit(cache=True)(_minutes_kernel)
+except Exception:  # numba not installed -> numpy path
+    pass
+
+
+def decide_minutes_batch(base, soil, temp, rain, standing_water) -> np.ndarray:
+    """Vectorised decide_minutes_from_signals; all arguments broadcast as arrays."""
+    base = np.asarray(base, dtype=np.int64)
+    soil = np.asarray(soil, dtype=np.float64)
+    temp = np.asarray(temp, dtype=np.float64)
+    rain = np.asarray(rain, dtype=np.float64)
+    standing = np.asarray(standing_water, dtype=np.bool_)
+    base, soil, temp, rain, standing = np.broadcast_arrays(base, soil, temp, rain, standing)
+    return _minutes_kernel(base, soil, temp, rain, standing).astype(np.int64)
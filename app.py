@@ -1,7 +1,11 @@
 # Removed duplicate minimal loader; main application with schedule API is defined below.
 # app.py — UI + basic schedule API so the dashboard stays "online"
 from pathlib import Path
+import copy
 import json
+import queue
+import threading
+import time
 from flask import Flask, render_template, send_from_directory, request, jsonify
 import re
 from flask import request, jsonify
@@ -14,52 +18,138 @@ DATA.mkdir(exist_ok=True)
 SCHEDULE_JSON = DATA / "schedule.json"
 DEFAULT_SCHEDULE = {"zones": {"1": {"minutes": 10, "enabled": True}}}
 
+# Parsed schedule.json, keyed on the file's (mtime_ns, size) so edits made
+# outside the app are still picked up on the next request.
+_SCHED_CACHE = {"stamp": None, "data": None}
+
+def _stamp(st):
+    return (st.st_mtime_ns, st.st_size)
+
 def load_schedule():
     if not SCHEDULE_JSON.exists():
-        SCHEDULE_JSON.write_text(json.dumps(DEFAULT_SCHEDULE, indent=2), encoding="utf-8")
-    return json.loads(SCHEDULE_JSON.read_text(encoding="utf-8"))
+        save_schedule(DEFAULT_SCHEDULE)
+    st = SCHEDULE_JSON.stat()
+    if _SCHED_CACHE["data"] is None or _SCHED_CACHE["stamp"] != _stamp(st):
+        _SCHED_CACHE["data"] = json.loads(SCHEDULE_JSON.read_text(encoding="utf-8"))
+        _SCHED_CACHE["stamp"] = _stamp(st)
+    # hand out a copy: callers edit the result before save_schedule(), and the
+    # cache must only change once that write has succeeded
+    return copy.deepcopy(_SCHED_CACHE["data"])
 
 def save_schedule(d):
-    SCHEDULE_JSON.write_text(json.dumps(d, indent=2), encoding="utf-8")
+    text = json.dumps(d, indent=2)
+    SCHEDULE_JSON.write_text(text, encoding="utf-8")
+    # cache a private copy so later edits to `d` (e.g. DEFAULT_SCHEDULE) can't leak in
+    _SCHED_CACHE["data"] = json.loads(text)
+    _SCHED_CACHE["stamp"] = _stamp(SCHEDULE_JSON.stat())
 
 # --- Add near your other imports ---
 import re
 from flask import request, jsonify
 
 # --- Put this helper anywhere in app.py ---
+# Intents in priority order: when a message matches several, the earliest wins.
+_INTENTS = [
+    ("greet", r"\b(?:hi|hello|hey|good (?:morning|afternoon|evening))\b"),
+    ("start", r"start now|run now|water now"),
+    ("stop", r"stop|cancel"),
+    ("schedule", r"schedule|timer"),
+    ("leak", r"leak|burst"),
+    ("weather", r"weather|rain|forecast"),
+    ("help", r"help|what can you do"),
+]
+# One compiled pattern for all intents. The lookahead makes finditer try every
+# position, so a lower-priority match can't hide an overlapping higher one.
+_INTENT_RE = re.compile("(?=" + "|".join(f"(?P<{name}>{pat})" for name, pat in _INTENTS) + ")")
+_INTENT_RANK = {name: i for i, (name, _) in enumerate(_INTENTS)}
+
+_REPLIES = {
+    "greet": "Hi! I’m Astra. I can set timers, start/stop watering, and keep an eye out for leaks. What would you like to do?",
+    # TODO: hook your real start function here
+    "start": "Starting zone 1 for 10 minutes. Say “stop” if you want me to cut it short.",
+    # TODO: hook your real stop function here
+    "stop": "Okay, watering stopped.",
+    "schedule": "Your default is zone 1 at 5:00 AM for 10 minutes, daily. Want to change zone, time, duration, or frequency?",
+    "leak": "I’ll watch for pressure drops and standing water. If I detect a leak, I’ll stop watering and alert you.",
+    "weather": "If rain is expected or soil looks wet, I’ll skip or reduce watering so we don’t waste water.",
+    "help": ("I can set watering schedules, start/stop zones, adjust duration, and avoid overwatering using basic checks. "
+             "Try: “Set zone 1 to 12 minutes every other day at 5:15 AM.”"),
+}
+
 def local_astute_reply(user_text: str) -> str:
     """Fast offline fallback: simple intent engine so Astra feels conversational."""
     t = user_text.strip().lower()
 
-    # greetings
-    if re.search(r"\b(hi|hello|hey|good (morning|afternoon|evening))\b", t):
-        return "Hi! I’m Astra. I can set timers, start/stop watering, and keep an eye out for leaks. What would you like to do?"
-
-    # quick intents
-    if "start now" in t or "run now" in t or "water now" in t:
-        # TODO: hook your real start function here
-        return "Starting zone 1 for 10 minutes. Say “stop” if you want me to cut it short."
-
-    if "stop" in t or "cancel" in t:
-        # TODO: hook your real stop function here
-        return "Okay, watering stopped."
-
-    if "schedule" in t or "timer" in t:
-        return "Your default is zone 1 at 5:00 AM for 10 minutes, daily. Want to change zone, time, duration, or frequency?"
-
-    if "leak" in t or "burst" in t:
-        return "I’ll watch for pressure drops and standing water. If I detect a leak, I’ll stop watering and alert you."
-
-    if "weather" in t or "rain" in t or "forecast" in t:
-        return "If rain is expected or soil looks wet, I’ll skip or reduce watering so we don’t waste water."
-
-    if "help" in t or "what can you do" in t:
-        return ("I can set watering schedules, start/stop zones, adjust duration, and avoid overwatering using basic checks. "
-                "Try: “Set zone 1 to 12 minutes every other day at 5:15 AM.”")
+    best = None
+    for m in _INTENT_RE.finditer(t):
+        rank = _INTENT_RANK[m.lastgroup]
+        if best is None or rank < best:
+            best = rank
+            if rank == 0:
+                break
+    if best is not None:
+        return _REPLIES[_INTENTS[best][0]]
 
     # default
     return "Got it. Do you want me to start watering now, adjust the schedule, or check for issues?"
 
+# --- Chat micro-batching ---
+# /chat requests are queued and answered in batches by one worker thread, so a
+# batched model call (llama_cpp, vLLM, ...) can serve several users per
+# generation instead of one request tying up each Flask thread. A batch is sent
+# when it reaches CHAT_BATCH_N prompts or CHAT_BATCH_MS after the first arrived.
+CHAT_BATCH_N = 8
+CHAT_BATCH_MS = 10
+CHAT_TIMEOUT_S = 5.0
+
+class _ChatJob:
+    __slots__ = ("text", "reply", "done")
+
+    def __init__(self, text):
+        self.text = text
+        self.reply = None
+        self.done = threading.Event()
+
+_chat_q = queue.Queue(maxsize=256)
+
+def generate_replies(texts):
+    """Answer a batch of prompts, in order. Wire a batched LLM call in here."""
+    return [local_astute_reply(t) for t in texts]
+
+def _chat_batcher():
+    while True:
+        jobs = [_chat_q.get()]
+        deadline = time.monotonic() + CHAT_BATCH_MS / 1000.0
+        while len(jobs) < CHAT_BATCH_N:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                jobs.append(_chat_q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            replies = generate_replies([j.text for j in jobs])
+        except Exception as e:
+            print("CHAT BATCH ERROR:", repr(e))
+            replies = [None] * len(jobs)
+        for job, reply in zip(jobs, replies):
+            job.reply = reply
+            job.done.set()
+
+threading.Thread(target=_chat_batcher, name="chat-batcher", daemon=True).start()
+
+def batched_reply(user_text: str) -> str:
+    """Queue a prompt for the batcher; fall back to the local engine if it's busy or slow."""
+    job = _ChatJob(user_text)
+    try:
+        _chat_q.put_nowait(job)
+    except queue.Full:
+        return local_astute_reply(user_text)
+    if job.done.wait(CHAT_TIMEOUT_S) and job.reply:
+        return job.reply
+    return local_astute_reply(user_text)
+
 # --- Replace your existing /chat with this robust version ---
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.config["TEMPLATES_AUTO_RELOAD"] = True
@@ -77,9 +167,9 @@ def chat():
         if not user_text:
             return jsonify({"reply": "Tell me what you’d like me to do—for example, “start watering now.”"}), 200
 
-        # TODO: If you wire in an external model, call it here with a small timeout.
-        # If it fails, fall back to local_astute_reply.
-        reply = local_astute_reply(user_text)
+        # TODO: If you wire in an external model, do it in generate_replies;
+        # batched_reply already times out and falls back to local_astute_reply.
+        reply = batched_reply(user_text)
         return jsonify({"reply": reply}), 200
 
     except Exception as e:
@@ -16,6 +16,14 @@ from vosk import Model, KaldiRecognizer
 # TTS
 import pyttsx3
 
+# Proper anti-aliased resampling (optional; falls back to numpy averaging)
+try:
+    from scipy.signal import firwin, lfilter
+    from audio_resample import StreamResampler
+    SCIPY_AVAILABLE = True
+except Exception:
+    SCIPY_AVAILABLE = False
+
 # Local LLM hook (optional)
 try:
     from llama_cpp import Llama
@@ -62,7 +70,21 @@ if device_samplerate % MODEL_SAMPLE_RATE == 0:
 else:
     decimation = None
     print(f"WARNING: device samplerate {device_samplerate} is NOT an integer multiple of model rate {MODEL_SAMPLE_RATE}.")
-    print("The script will attempt a crude fallback; results may be poor. Consider using a device with sample rate multiple of 16000.")
+    if SCIPY_AVAILABLE:
+        print("Resampling with a streaming polyphase filter (scipy FIR).")
+    else:
+        print("The script will attempt a crude fallback; results may be poor. Consider using a device with sample rate multiple of 16000.")
+
+# Anti-aliasing low-pass for integer decimation, designed once (same FIR order
+# scipy.signal.decimate uses). Filter state is carried across audio blocks.
+_aa_taps = None
+if SCIPY_AVAILABLE and decimation and decimation > 1:
+    _aa_taps = firwin(20 * decimation + 1, 1.0 / decimation)
+# Stateful polyphase resampler for the non-integer path; it carries history and
+# output phase across blocks, so the stream stays at exactly MODEL_SAMPLE_RATE.
+_resampler = None
+if SCIPY_AVAILABLE and not decimation:
+    _resampler = StreamResampler(MODEL_SAMPLE_RATE, device_samplerate)
 
 SAMPLE_RATE = device_samplerate
 CHANNELS = 1  # keep mono for ASR
@@ -107,11 +129,59 @@ def audio_callback(indata, frames, time_info, status):
     # indata is memoryview-like; convert to bytes
     q.put(bytes(indata))
 
+# Scratch buffers for downsample_int16_bytes, grown on demand and reused across
+# audio blocks so the callback path doesn't allocate per block.
+_ds_buf = np.empty(0, dtype=np.int16)   # carried-over samples + current block
+_ds_acc = np.empty(0, dtype=np.int32)   # per-output-sample sums
+_ds_out = np.empty(0, dtype=np.int16)
+_ds_carry = 0                           # samples left over from the last block
+
+_aa_zi = None    # lfilter state for the FIR decimator
+_aa_phase = 0    # offset of the next kept sample within the following block
+
+def reset_downsampler():
+    """Drop samples and filter state carried over from a previous recording."""
+    global _ds_carry, _aa_zi, _aa_phase
+    _ds_carry = 0
+    _aa_zi = None
+    _aa_phase = 0
+    if _resampler is not None:
+        _resampler.reset()
+
+def _to_int16_bytes(y) -> bytes:
+    return np.clip(np.rint(y), -32768, 32767).astype(np.int16).tobytes()
+
+def fir_decimate_int16_bytes(b: bytes, factor: int) -> bytes:
+    """Low-pass with the cached FIR, then keep every factor'th sample (streaming-safe)."""
+    global _aa_zi, _aa_phase
+    x = np.frombuffer(b, dtype=np.int16)
+    if x.size == 0:
+        return b
+    if _aa_zi is None:
+        _aa_zi = np.zeros(len(_aa_taps) - 1)
+    y, _aa_zi = lfilter(_aa_taps, 1.0, x, zi=_aa_zi)
+    out = y[_aa_phase::factor]
+    _aa_phase = (_aa_phase - x.size) % factor
+    return _to_int16_bytes(out)
+
+def resample_poly_int16_bytes(b: bytes) -> bytes:
+    """Polyphase resample one block from the device rate to MODEL_SAMPLE_RATE (streaming-safe)."""
+    x = np.frombuffer(b, dtype=np.int16)
+    if x.size == 0:
+        return b
+    return _to_int16_bytes(_resampler.process(x.astype(np.float64)))
+
 def downsample_int16_bytes(b: bytes, factor: int) -> bytes:
     """
-    Convert raw int16 bytes -> int16 numpy -> take every factor'th sample -> return bytes.
+    Convert raw int16 bytes -> int16 numpy -> average each run of `factor` samples -> return bytes.
+    Averaging (a boxcar FIR) instead of plain sample-picking cuts most of the aliasing.
+    Samples that don't fill a whole run are carried into the next block.
     Assumes little-endian int16 PCM.
+    Not thread-safe: the scratch buffers and the carry are module state, so only
+    the single recording thread may call this; a second caller would corrupt
+    _ds_carry and splice its samples into the other stream.
     """
+    global _ds_buf, _ds_acc, _ds_out, _ds_carry
     if factor is None or factor == 1:
         return b
     arr = np.frombuffer(b, dtype=np.int16)
@@ -125,8 +195,24 @@ def downsample_int16_bytes(b: bytes, factor: int) -> bytes:
         except Exception:
             # fallback: just decimate raw array
             pass
-    dec = arr[::factor]
-    return dec.tobytes()
+    total = _ds_carry + arr.size
+    if _ds_buf.size < total:
+        grown = np.empty(max(total, 2 * _ds_buf.size), dtype=np.int16)
+        grown[:_ds_carry] = _ds_buf[:_ds_carry]
+        _ds_buf = grown
+    _ds_buf[_ds_carry:total] = arr
+    n = total // factor
+    if _ds_acc.size < n:
+        _ds_acc = np.empty(n, dtype=np.int32)
+        _ds_out = np.empty(n, dtype=np.int16)
+    acc, out = _ds_acc[:n], _ds_out[:n]
+    used = n * factor
+    np.sum(_ds_buf[:used].reshape(n, factor), axis=1, dtype=np.int32, out=acc)
+    np.floor_divide(acc, factor, out=acc)
+    np.copyto(out, acc, casting="unsafe")
+    _ds_carry = total - used
+    _ds_buf[:_ds_carry] = _ds_buf[used:total]
+    return out.tobytes()
 
 def record_and_transcribe(timeout=6):
     """Capture audio at device SAMPLE_RATE, downsample to MODEL_SAMPLE_RATE, feed Vosk."""
@@ -136,6 +222,7 @@ def record_and_transcribe(timeout=6):
 
     print("Listening... (speak now)")
     recognizer.Reset()
+    reset_downsampler()
     start = time.time()
     try:
         with sd.RawInputStream(samplerate=SAMPLE_RATE,
@@ -154,8 +241,12 @@ def record_and_transcribe(timeout=6):
                     print("Transcribed (final, timeout):", text)
                     return text
                 # downsample if needed
-                if decimation:
+                if decimation and _aa_taps is not None:
+                    send_bytes = fir_decimate_int16_bytes(data, decimation)
+                elif decimation:
                     send_bytes = downsample_int16_bytes(data, decimation)
+                elif SCIPY_AVAILABLE:
+                    send_bytes = resample_poly_int16_bytes(data)
                 else:
                     # crude fallback: if device rate > model rate but not integer multiple,
                     # attempt simple linear interpolation by reshaping and taking every Nth approx.
@@ -0,0 +1,55 @@
+# audio_resample.py
+# Streaming polyphase resampler for int16 PCM blocks (used by astra_offline.py).
+import numpy as np
+from scipy.signal import firwin
+
+
+class StreamResampler:
+    """
+    Rational up/down resampler that carries input history and output position
+    across blocks, so feeding a stream block by block gives the same samples as
+    scipy.signal.resample_poly over the whole stream (same kaiser(5.0) FIR,
+    same delay compensation) and exactly up/down output samples per input
+    sample in the long run.
+    Outputs are only emitted once all the input they depend on has arrived, so
+    each block's output lags its input by about half the filter length.
+    """
+
+    def __init__(self, up: int, down: int):
+        g = int(np.gcd(up, down))
+        self.up, self.down = up // g, down // g
+        max_rate = max(self.up, self.down)
+        self.half_len = 10 * max_rate
+        h = firwin(2 * self.half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        # polyphase split: row p holds h[p], h[p+up], h[p+2*up], ... (zero padded)
+        self.ntaps = -(-len(h) // self.up)
+        poly = np.zeros(self.up * self.ntaps)
+        poly[:len(h)] = h
+        self._poly = poly.reshape(self.ntaps, self.up).T.copy()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget carried input and restart output at sample 0."""
+        # history starts with ntaps-1 zeros standing in for the samples before t=0
+        self._hist = np.zeros(self.ntaps - 1)
+        self._base = -(self.ntaps - 1)   # absolute input index of _hist[0]
+        self._next = 0                   # absolute index of the next output sample
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        """Feed one block of input samples; returns the float64 output now complete."""
+        self._hist = np.concatenate((self._hist, x))
+        total = self._base + self._hist.size        # input samples received so far
+        # output n needs input up to (n*down + half_len) // up
+        end = max(self._next, (total * self.up - 1 - self.half_len) // self.down + 1)
+        n = np.arange(self._next, end)
+        m = n * self.down + self.half_len
+        q, p = m // self.up, m % self.up
+        idx = (q - self._base)[:, None] - np.arange(self.ntaps)[None, :]
+        y = np.einsum("ij,ij->i", self._poly[p], self._hist[idx])
+        self._next = end
+        # keep only the history the next output can still reach
+        first = (self._next * self.down + self.half_len) // self.up - (self.ntaps - 1)
+        drop = min(max(0, first - self._base), self._hist.size)
+        self._hist = self._hist[drop:]
+        self._base += drop
+        return y
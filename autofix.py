@@ -2,30 +2,42 @@ import os
 import re
 
 PROJECT_DIR = r"C:\Users\alpha\Desktop\IngeniousIrrigation"
+# "C:\..." string literal not already raw
+_WIN_PATH_RE = re.compile(rb'(?<!r)"([A-Z]:\\[^"]+)"')
+
+
+def read_source(path):
+    """Read a whole file into one exact-size buffer (single allocation, no regrowth)."""
+    with open(path, "rb", buffering=0) as f:
+        buf = bytearray(os.fstat(f.fileno()).st_size)
+        view = memoryview(buf)
+        got = 0
+        while got < len(buf):
+            n = f.readinto(view[got:])
+            if not n:
+                break
+            got += n
+    return buf if got == len(buf) else buf[:got]
 
 
 def clean_file(path):
-    with open(path, "rb") as f:
-        raw = f.read()
+    raw = read_source(path)
+
+    # Everything below works on the bytes directly: no decode/encode round
+    # trip and no per-line Python loop.
 
     # Remove BOM if present
     if raw.startswith(b'\xef\xbb\xbf'):
         raw = raw[3:]
 
-    text = raw.decode("utf-8", errors="replace")
-
     # Fix Windows paths
-    text = re.sub(r'(?<!r)"([A-Z]:\\[^"]+)"', r'r"\1"', text)
+    raw = _WIN_PATH_RE.sub(rb'r"\1"', raw)
 
-    # Normalize indentation
-    lines = text.splitlines()
-    fixed_lines = []
-    for line in lines:
-        # Convert tabs to 4 spaces
-        fixed_lines.append(line.replace("\t", "    "))
+    # Normalize line endings, convert tabs to 4 spaces
+    raw = raw.replace(b"\r\n", b"\n").replace(b"\t", b"    ")
 
-    with open(path, "w", encoding="utf-8") as f:
-        f.write("\n".join(fixed_lines))
+    with open(path, "wb") as f:
+        f.write(raw)
 
 
 def scan_and_fix():
@@ -34,9 +46,16 @@ def scan_and_fix():
             if file.endswith(".py"):
                 full_path = os.path.join(root, file)
                 try:
-                    compile(open(full_path, encoding="utf-8").read(),
-                            full_path, "exec")
+                    raw = read_source(full_path)
+                    # compile() takes the bytes as-is (honours BOM / coding cookie)
+                    compile(raw, full_path, "exec")
                 except SyntaxError as e:
+                    try:
+                        raw.decode("utf-8")
+                    except UnicodeDecodeError:
+                        # not UTF-8 (e.g. UTF-16): clean_file would mangle it
+                        print(f"[SKIP] {file}: not UTF-8")
+                        continue
                     print(f"[FIXING] {file}: {e}")
                     clean_file(full_path)
                 except Exception as e:
@@ -0,0 +1,80 @@
+# build_trt_engine.py
+# Builds the TensorRT engines irrigation_api.py prefers over the .pt weights.
+# FP16 needs nothing else; INT8 is calibrated on the images users uploaded
+# (uploads/), so the activation ranges match real lawn photos.
+#
+#   python build_trt_engine.py                    # FP16 -> models/ingenious_yolov8.engine
+#   python build_trt_engine.py --int8             # INT8 -> models/ingenious_yolov8_int8.engine
+#   python build_trt_engine.py --int8 --calib some/folder --fraction 0.5
+from __future__ import annotations
+import argparse
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+IMG_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def export_engine(weights: str, out: str, int8: bool = False, calib_dir: str | None = None,
+                  fraction: float = 1.0, batch: int = 8) -> str:
+    """Export `weights` to a TensorRT engine at `out`; returns the model task.
+
+    INT8 calibration goes through ultralytics' own calibrator, which reads the
+    'val' split of a data yaml -- a throwaway one pointing at calib_dir.
+    The engine takes dynamic batches of up to `batch` images, for
+    irrigation_api's micro-batching.
+    The export runs on a copy of `weights` in a scratch directory next to
+    `out`, and the finished engine is moved into place with os.replace, so a
+    reader never sees a half-written engine at `out`.
+    """
+    import torch
+    from ultralytics import YOLO
+    if not torch.cuda.is_available():
+        raise RuntimeError("TensorRT export needs a CUDA GPU")
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    work = tempfile.mkdtemp(dir=Path(out).parent, prefix=".export-")
+    model = YOLO(shutil.copy2(weights, work))
+    kw = dict(format="engine", imgsz=640, device=0, workspace=1, dynamic=True, batch=batch)
+    tmp = None
+    if int8:
+        calib = Path(calib_dir).resolve()
+        if not any(f.lower().endswith(IMG_EXTS) for f in os.listdir(calib)):
+            raise RuntimeError(f"no calibration images in {calib}")
+        names = "\n".join(f"  {i}: {n}" for i, n in model.names.items())
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+            f.write(f"path: {calib.as_posix()}\ntrain: .\nval: .\nnames:\n{names}\n")
+            tmp = f.name
+        kw.update(int8=True, data=tmp, fraction=fraction)
+    else:
+        kw.update(half=True)
+    try:
+        built = model.export(**kw)
+        os.replace(built, out)  # same filesystem as `out`, so this is atomic
+    finally:
+        if tmp:
+            os.unlink(tmp)
+        shutil.rmtree(work, ignore_errors=True)
+    return model.task
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--weights", default=os.getenv("II_YOLO_WEIGHTS", str(ROOT / "models" / "ingenious_yolov8.pt")))
+    ap.add_argument("--int8", action="store_true", help="INT8-calibrated engine instead of FP16")
+    ap.add_argument("--calib", default=str(ROOT / "uploads"), help="Calibration images (--int8)")
+    ap.add_argument("--fraction", type=float, default=1.0, help="Share of --calib images to use")
+    ap.add_argument("--batch", type=int, default=int(os.getenv("II_YOLO_BATCH", "8")), help="Max batch size")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    name = "ingenious_yolov8_int8.engine" if args.int8 else "ingenious_yolov8.engine"
+    out = args.out or str(ROOT / "models" / name)
+    task = export_engine(args.weights, out, int8=args.int8, calib_dir=args.calib, fraction=args.fraction,
+                         batch=args.batch)
+    print(f"[OK] {out} ({'int8' if args.int8 else 'fp16'}, task={task})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 # burst_guard.py — detects abnormal flow or standing water and triggers shutdown
+import os
 import time
 
+STANDING_WATER_FLAG = "data/standing_water.flag"
+
 class BurstGuard:
     def __init__(self, hw, notifier, flow_sensor=None):
         self.hw = hw
@@ -11,16 +14,28 @@ class BurstGuard:
         self.max_continuous_minutes = 90
         self.last_on_ts = None
         self.last_seen_standing = False
+        self._flag_cache = (None, False)  # ((mtime_ns, size), value) of the last flag read
 
     def _standing_water_detected(self) -> bool:
         # Placeholder for your AI detector (e.g., YOLO flag shared via file or IPC)
         # You can replace with real signal; here we check a temp file flag if present.
+        # check() may run in a tight loop, so the file is only re-read when its
+        # mtime/size change; otherwise this costs one stat().
+        try:
+            st = os.stat(STANDING_WATER_FLAG)
+        except OSError:
+            return False
+        key = (st.st_mtime_ns, st.st_size)
+        if key == self._flag_cache[0]:
+            return self._flag_cache[1]
         try:
-            with open("data/standing_water.flag","r") as f:
+            with open(STANDING_WATER_FLAG,"r") as f:
                 v = f.read().strip().lower()
-                return v in ("1","true","yes")
         except Exception:
             return False
+        value = v in ("1","true","yes")
+        self._flag_cache = (key, value)
+        return value
 
     def _flow_abnormal(self) -> bool:
         if not self.flow_sensor: return False
@@ -0,0 +1,142 @@
+# camera_capture.py — one persistent camera per device, shared by the camera APIs
+"""
+Opening a VideoCapture costs hundreds of ms (V4L2 / DirectShow init), so each
+device is opened once and a background thread keeps reading frames into a
+slot. get_frame() just copies the newest frame out of that slot, as long as
+it is recent: a camera that stops delivering raises instead of serving the
+last good frame forever.
+
+snapshot_frame() is the one entry point for services that analyse "the
+camera": in-process when the camera is local, over HTTP otherwise.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class SharedCamera:
+    # consecutive failed reads before the device is closed and reopened
+    REOPEN_AFTER = 50
+
+    def __init__(self, index: int, width: Optional[int] = None, height: Optional[int] = None):
+        self.index = index
+        self.width = width
+        self.height = height
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._stamp = 0.0  # time.monotonic() when _frame was read
+        self._thread: Optional[threading.Thread] = None
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.index, cv2.CAP_ANY)
+        if self.width:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return cap
+
+    def _grab_loop(self):
+        cap = self._open()
+        failures = 0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                failures += 1
+                if failures >= self.REOPEN_AFTER:
+                    cap.release()
+                    cap = self._open()
+                    failures = 0
+                time.sleep(0.02 if cap.isOpened() else 1.0)
+                continue
+            failures = 0
+            with self._cond:
+                self._frame = frame
+                self._stamp = time.monotonic()
+                self._cond.notify_all()
+
+    def _ensure_started(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._grab_loop, daemon=True,
+                                                name=f"camera-{self.index}")
+                self._thread.start()
+
+    def get_frame(self, timeout: float = 5.0) -> np.ndarray:
+        """Latest frame (a private copy), at most `timeout` seconds old.
+
+        Blocks for up to `timeout` waiting for one if the slot is empty or stale.
+        """
+        self._ensure_started()
+        fresh = lambda: self._frame is not None and time.monotonic() - self._stamp <= timeout
+        with self._cond:
+            if not self._cond.wait_for(fresh, timeout):
+                raise RuntimeError("Camera capture timeout")
+            return self._frame.copy()
+
+
+_cameras: Dict[Tuple[int, Optional[int], Optional[int]], SharedCamera] = {}
+_cameras_lock = threading.Lock()
+
+
+def get_camera(index: int = 0, width: Optional[int] = None, height: Optional[int] = None) -> SharedCamera:
+    key = (index, width, height)
+    with _cameras_lock:
+        cam = _cameras.get(key)
+        if cam is None:
+            cam = _cameras[key] = SharedCamera(index, width, height)
+        return cam
+
+
+def get_frame(index: int = 0, width: Optional[int] = None, height: Optional[int] = None,
+              timeout: float = 5.0) -> np.ndarray:
+    return get_camera(index, width, height).get_frame(timeout)
+
+
+# II_CAMERA_BASE=local -> read this process's camera directly (no HTTP, no JPEG, no disk)
+LOCAL_CAMERA = "local"
+LOCAL_CAM_INDEX = int(os.getenv("CAM_INDEX", "0"))
+
+_http = None
+_http_lock = threading.Lock()
+
+
+def _http_session():
+    """Keep-alive session to the camera service, so each snapshot skips the TCP handshake."""
+    global _http
+    with _http_lock:
+        if _http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _http = s
+        return _http
+
+
+def snapshot_frame(camera_base: str, label: str = "analyze", timeout: float = 5.0) -> np.ndarray:
+    """Current camera frame as BGR, from this process or from a camera service.
+
+    A service /snapshot that answers with image bytes is decoded straight from
+    memory; one that answers JSON {"path": ...} is read from that path.
+    """
+    if camera_base == LOCAL_CAMERA:
+        return get_frame(LOCAL_CAM_INDEX, timeout=timeout)
+
+    r = _http_session().get(f"{camera_base}/snapshot", params={"label": label}, timeout=timeout)
+    r.raise_for_status()
+    if r.headers.get("Content-Type", "").startswith("image/"):
+        img = cv2.imdecode(np.frombuffer(r.content, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        p = r.json().get("path")
+        if not p or not os.path.exists(p):
+            raise RuntimeError("no snapshot path")
+        img = cv2.imread(p)
+    if img is None:
+        raise RuntimeError("could not decode snapshot")
+    return img
@@ -1,11 +1,24 @@
 # camera_util.py â€” returns a latest image path if present
 from __future__ import annotations
+import os
 from pathlib import Path
 from typing import Optional
 
 CAMERA_DIR = Path(__file__).parent / 'camera'
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+# Last scan, keyed on the directory mtime (changes only when files are added/removed)
+_CACHE = {'mtime': -1, 'result': None}
 
 def latest_image() -> Optional[str]:
-    if not CAMERA_DIR.exists(): return None
-    imgs = sorted([p for p in CAMERA_DIR.iterdir() if p.suffix.lower() in {'.jpg','.jpeg','.png'}], reverse=True)
-    return str(imgs[0]) if imgs else None
\ No newline at end of file
+    try:
+        mt = CAMERA_DIR.stat().st_mtime_ns
+    except OSError:
+        return None
+    if mt == _CACHE['mtime']:
+        return _CACHE['result']
+    with os.scandir(CAMERA_DIR) as it:
+        latest = max((e.name for e in it if e.name.lower().endswith(IMAGE_EXTS)), default=None)
+    result = str(CAMERA_DIR / latest) if latest else None
+    _CACHE['mtime'], _CACHE['result'] = mt, result
+    return result
\ No newline at end of file
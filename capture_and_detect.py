@@ -1,23 +1,12 @@
 # capture_and_detect.py
 import cv2
 import argparse
-import time
+from camera_capture import get_frame
 from green_detector import pct_green_from_bgr_image, hydration_need_from_green_frac, visualize_mask_on_image
 
 def capture_frame(device_index=0, width=None, height=None, timeout=5.0):
-    cap = cv2.VideoCapture(device_index, cv2.CAP_ANY)
-    start = time.time()
-    if width: cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-    if height: cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-
-    while True:
-        ok, frame = cap.read()
-        if ok:
-            cap.release()
-            return frame
-        if time.time() - start > timeout:
-            cap.release()
-            raise RuntimeError("Camera capture timeout - no frame obtained")
+    # shared with the Flask APIs; see camera_capture.py
+    return get_frame(device_index, width, height, timeout=timeout)
 
 def main():
     parser = argparse.ArgumentParser()
@@ -28,7 +17,7 @@ def main():
     args = parser.parse_args()
 
     frame = capture_frame(args.device, args.width, args.height)
-    green_frac, mask = pct_green_from_bgr_image(frame)
+    green_frac, mask = pct_green_from_bgr_image(frame, return_mask=bool(args.debug_out))
     score = hydration_need_from_green_frac(green_frac)
 
     print(f"green_fraction={green_frac:.4f}, hydration_need={score:.2f} (0=dry -> 10=oversat)")
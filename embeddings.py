@@ -0,0 +1,173 @@
+# embeddings.py
+# One all-MiniLM-L6-v2 sentence embedder per process, shared by rag_server and teach_api,
+# plus the knowledge-base helpers (ii_kb collection, knowledge.jsonl records) that
+# teach_api, train_api and voice_trainer write through
+from __future__ import annotations
+import os
+import json
+import atexit
+import logging
+import functools
+import threading
+from pathlib import Path
+from typing import Callable, Sequence
+import numpy as np
+
+try:
+    import orjson  # optional: ~20x faster than json.dumps, and yields bytes
+except Exception:
+    orjson = None
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_DIM = 384
+# ONNX export of the same model, used instead of torch when present:
+#   optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 onnx_minilm
+ONNX_DIR = Path(os.getenv("EMBED_ONNX_DIR", Path(__file__).resolve().parent / "onnx_minilm"))
+MAX_SEQ_LEN = 256  # SentenceTransformer's max_seq_length for this model
+# Chroma "ii_kb" settings shared by teach_api, train_api and voice_trainer. The KB
+# takes many small upserts, so a sparser graph (M 8, vs 16) built with less effort
+# (construction_ef 64, vs 100) trades write cost for a wider search beam (search_ef
+# 64, vs 10), which more than recovers the recall. HNSW params only apply when
+# the collection is first created.
+KB_COLLECTION_METADATA = {"hnsw:space": "cosine", "hnsw:M": 8,
+                          "hnsw:construction_ef": 64, "hnsw:search_ef": 64}
+KB_CHROMA_DIR = Path("data/knowledge") / "chroma"
+
+logger = logging.getLogger("embeddings")
+_embedder_lock = threading.Lock()
+_kb_collection_lock = threading.Lock()
+
+
+def jsonl_line(entry: dict) -> bytes:
+    """One UTF-8 JSON record plus newline (non-ASCII kept as-is)."""
+    if orjson is not None:
+        return orjson.dumps(entry) + b"\n"
+    return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@functools.lru_cache(maxsize=1)
+def _open_kb_collection():
+    import chromadb  # heavy; only paid once the KB is actually used
+    chroma = chromadb.PersistentClient(path=str(KB_CHROMA_DIR))
+    return chroma.get_or_create_collection(name="ii_kb", metadata=KB_COLLECTION_METADATA)
+
+
+def get_kb_collection():
+    """Process-wide handle on the Chroma "ii_kb" collection; opened on first call, never twice."""
+    with _kb_collection_lock:
+        return _open_kb_collection()
+
+
+def _onnx_encode(tokenizer, session, texts: Sequence[str], batch_size: int) -> np.ndarray:
+    """Tokenize, run the encoder, mean-pool over real tokens and L2-normalize."""
+    feeds = {i.name for i in session.get_inputs()}
+    out = []
+    for start in range(0, len(texts), batch_size):
+        enc = tokenizer.encode_batch(list(texts[start:start + batch_size]))
+        ids = np.array([e.ids for e in enc], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in feeds:
+            feed["token_type_ids"] = np.zeros_like(ids)
+        hidden = session.run(None, feed)[0]  # last_hidden_state (n, seq, dim)
+        m = mask[..., None].astype(np.float32)
+        pooled = (hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        out.append(pooled.astype(np.float32))
+    return np.concatenate(out) if out else np.zeros((0, EMBED_DIM), np.float32)
+
+
+def _load_onnx() -> Callable[[Sequence[str], int], np.ndarray]:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    tokenizer = Tokenizer.from_file(str(ONNX_DIR / "tokenizer.json"))
+    tokenizer.enable_truncation(MAX_SEQ_LEN)
+    tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider")
+                 if p in ort.get_available_providers()] or ["CPUExecutionProvider"]
+    session = ort.InferenceSession(str(ONNX_DIR / "model.onnx"), so, providers=providers)
+    return functools.partial(_onnx_encode, tokenizer, session)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_embedder() -> Callable[[Sequence[str], int], np.ndarray]:
+    if (ONNX_DIR / "model.onnx").exists():
+        try:
+            encode = _load_onnx()
+            logger.info(f"Embedding with ONNX Runtime from {ONNX_DIR}")
+            return encode
+        except Exception as e:  # onnxruntime / tokenizers missing, bad export
+            logger.warning(f"ONNX embedder unavailable ({e}); using SentenceTransformer")
+    import torch
+    from sentence_transformers import SentenceTransformer
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(EMBED_MODEL, device=device)
+    if device == "cuda":
+        model.half()  # fp16 weights: half the memory traffic, same neighbours
+
+    def encode(texts, batch_size):
+        with torch.inference_mode():
+            return model.encode(list(texts), batch_size=batch_size,
+                                convert_to_numpy=True, normalize_embeddings=True)
+
+    logger.info(f"Embedding with SentenceTransformer on {device}")
+    return encode
+
+
+def get_embedder() -> Callable[[Sequence[str], int], np.ndarray]:
+    """Process-wide encoder; loaded on first call, never twice."""
+    with _embedder_lock:
+        return _load_embedder()
+
+
+def embed(texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+    """L2-normalized float32 embeddings, one row per text (dot product = cosine)."""
+    return np.asarray(get_embedder()(texts, batch_size), dtype=np.float32)
+
+
+class ChromaBatcher:
+    """Queue upserts for a Chroma collection and embed them in one batch.
+
+    Flushes once max_pending docs are waiting, max_wait seconds after the first
+    one arrived, and at interpreter exit. get_collection is only called on the
+    first flush, so the Chroma client isn't opened until something is stored.
+    """
+
+    def __init__(self, get_collection: Callable[[], object], max_pending: int = 16, max_wait: float = 2.0):
+        self.get_collection = get_collection
+        self.max_pending = max_pending
+        self.max_wait = max_wait
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def add(self, doc_id: str, text: str, metadata: dict) -> None:
+        with self._lock:
+            self._pending.append((doc_id, text, metadata))
+            full = len(self._pending) >= self.max_pending
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.max_wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return
+        latest = {doc_id: (text, meta) for doc_id, text, meta in batch}  # upsert rejects repeated ids
+        ids = list(latest)
+        docs = [latest[i][0] for i in ids]
+        try:
+            self.get_collection().upsert(ids=ids, documents=docs, embeddings=embed(docs).tolist(),
+                                         metadatas=[latest[i][1] for i in ids])
+        except Exception as e:
+            logger.error(f"Chroma upsert of {len(ids)} docs failed: {e}")
@@ -3,6 +3,7 @@ from flask import Flask, jsonify, send_file, Response
 import cv2
 import io
 import time
+from camera_capture import get_frame
 from green_detector import pct_green_from_bgr_image, hydration_need_from_green_frac, visualize_mask_on_image
 import numpy as np
 
@@ -10,20 +11,14 @@ app = Flask(__name__)
 CAM_INDEX = 0
 CAPTURE_WIDTH = 1280
 CAPTURE_HEIGHT = 720
+# /snapshot is a debug preview: quality 80 baseline JPEG, no optimize pass
+SNAPSHOT_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 80,
+                        cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+                        cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
 
 def capture_frame():
-    cap = cv2.VideoCapture(CAM_INDEX, cv2.CAP_ANY)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
-    t0 = time.time()
-    while True:
-        ok, frame = cap.read()
-        if ok:
-            cap.release()
-            return frame
-        if time.time() - t0 > 5.0:
-            cap.release()
-            raise RuntimeError("Camera capture timeout")
+    # camera stays open between requests; see camera_capture.py
+    return get_frame(CAM_INDEX, CAPTURE_WIDTH, CAPTURE_HEIGHT, timeout=5.0)
 
 @app.route("/hydration")
 def hydration():
@@ -32,7 +27,7 @@ def hydration():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    green_frac, mask = pct_green_from_bgr_image(frame)
+    green_frac, _ = pct_green_from_bgr_image(frame, return_mask=False)
     score = hydration_need_from_green_frac(green_frac)
     # return JSON
     return jsonify({
@@ -53,7 +48,7 @@ def snapshot():
     vis = visualize_mask_on_image(frame, mask, alpha=0.6)
 
     # encode JPEG
-    ok, buf = cv2.imencode('.jpg', vis)
+    ok, buf = cv2.imencode('.jpg', vis, SNAPSHOT_JPEG_PARAMS)
     if not ok:
         return jsonify({"error": "failed to encode image"}), 500
     return Response(buf.tobytes(), mimetype='image/jpeg')
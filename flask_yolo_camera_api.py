@@ -2,12 +2,15 @@
 import os
 import time
 import io
-from typing import Tuple, Dict
+import threading
+from typing import Tuple, Dict, List, Optional
 
 import cv2
 import numpy as np
 from flask import Flask, jsonify, Response
 
+from camera_capture import get_frame
+
 # Optional: only import ultralytics if model will be used
 try:
     from ultralytics import YOLO
@@ -23,6 +26,9 @@ CAPTURE_WIDTH = int(os.getenv("CAPTURE_WIDTH", "1280"))
 CAPTURE_HEIGHT = int(os.getenv("CAPTURE_HEIGHT", "720"))
 MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "best.pt")  # change to your path if different
 USE_YOLO_IF_AVAILABLE = True  # will attempt YOLO if ultralytics is installed and file exists
+SNAPSHOT_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 80,   # baseline JPEG, no optimize pass
+                        cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+                        cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
 # -------------------------
 
 app = Flask(__name__)
@@ -30,24 +36,59 @@ app = Flask(__name__)
 # -------------------------
 # Color-based detector
 # -------------------------
-def pct_green_from_bgr_image(bgr_image: np.ndarray) -> Tuple[float, np.ndarray]:
-    hsv = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2HSV)
-    # HSV thresholds for green (tweak per camera)
-    lower = np.array([30, 40, 40])
-    upper = np.array([85, 255, 255])
-    mask = cv2.inRange(hsv, lower, upper)
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5,5))
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=1)
-    green_pixels = int(np.count_nonzero(mask))
-    total_pixels = mask.size
-    green_frac = (green_pixels / total_pixels) if total_pixels > 0 else 0.0
-    return float(green_frac), mask
+ANALYSIS_SIZE = (320, 180)  # green fraction is computed on a frame downscaled to fit this, aspect kept
+# HSV thresholds for green (tweak per camera)
+GREEN_LOWER = np.array([30, 40, 40])
+GREEN_UPPER = np.array([85, 255, 255])
+_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5,5))
+_CLOSE_KERNEL = np.ones((3,3), np.uint8)  # cheap close after the 5x5 open
+# Shared small/hsv/mask buffers, guarded by _SCRATCH_LOCK (requests run on
+# fresh threads, so per-thread buffers were never reused).
+_SCRATCH = {}
+_SCRATCH_LOCK = threading.Lock()
+
+def _scratch(name: str, shape: tuple) -> np.ndarray:
+    buf = _SCRATCH.get(name)  # caller holds _SCRATCH_LOCK
+    if buf is None or buf.shape != shape:
+        buf = _SCRATCH[name] = np.empty(shape, np.uint8)
+    return buf
+
+def _analysis_shape(w: int, h: int) -> Optional[Tuple[int, int]]:
+    s = min(ANALYSIS_SIZE[0] / w, ANALYSIS_SIZE[1] / h)
+    if s >= 1.0:
+        return None  # already small enough; never upscale
+    return max(1, round(w * s)), max(1, round(h * s))
+
+def pct_green_from_bgr_image(bgr_image: np.ndarray, return_mask: bool=True) -> Tuple[float, Optional[np.ndarray]]:
+    with _SCRATCH_LOCK:  # the scratch buffers are shared; hold it until the mask is copied out
+        h, w = bgr_image.shape[:2]
+        small = bgr_image
+        size = _analysis_shape(w, h)
+        if size is not None:
+            small = _scratch("small", (size[1], size[0], 3))
+            cv2.resize(bgr_image, size, dst=small, interpolation=cv2.INTER_AREA)
+        sh, sw = small.shape[:2]
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV, dst=_scratch("hsv", (sh, sw, 3)))
+        mask = cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER, dst=_scratch("mask", (sh, sw)))
+        cv2.morphologyEx(mask, cv2.MORPH_OPEN, _KERNEL, dst=mask, iterations=1)
+        cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _CLOSE_KERNEL, dst=mask, iterations=1)
+        green_pixels = cv2.countNonZero(mask)
+        total_pixels = mask.size
+        green_frac = (green_pixels / total_pixels) if total_pixels > 0 else 0.0
+        if not return_mask:
+            return float(green_frac), None
+        if mask.shape[:2] != (h, w):
+            return float(green_frac), cv2.resize(mask, (w, h), interpolation=cv2.INTER_NEAREST)
+        return float(green_frac), mask.copy()
+
+_GREEN_FILL = {}  # shape -> solid (0,255,0) image, read-only
 
 def visualize_mask_on_image(bgr_image: np.ndarray, mask: np.ndarray, alpha: float=0.5) -> np.ndarray:
-    overlay = bgr_image.copy()
-    overlay[mask > 0] = (0, 255, 0)
-    return cv2.addWeighted(overlay, alpha, bgr_image, 1 - alpha, 0)
+    green = _GREEN_FILL.get(bgr_image.shape)
+    if green is None:
+        green = _GREEN_FILL[bgr_image.shape] = np.full(bgr_image.shape, (0, 255, 0), np.uint8)
+    blended = cv2.addWeighted(green, alpha, bgr_image, 1 - alpha, 0)
+    return cv2.copyTo(blended, mask, bgr_image.copy())
 
 # Map fraction -> inverted 0..10 hydration_need scale
 def hydration_need_from_fraction(frac: float,
@@ -63,22 +104,36 @@ def hydration_need_from_fraction(frac: float,
         return 5.0 * (gf - dry_frac) / max(1e-6, (optimal_frac - dry_frac))
     return 5.0 + 5.0 * (gf - optimal_frac) / max(1e-6, (saturated_frac - optimal_frac))
 
+# Same mapping over an array of fractions (e.g. a per-cell green map), written
+# branch-free; numba is optional and only fuses the same expression into one loop.
+def _hydration_map_kernel(frac, dry_frac, optimal_frac, saturated_frac):
+    gf = np.minimum(np.maximum(frac, 0.0), 1.0)
+    low = 5.0 * (gf - dry_frac) / max(1e-6, (optimal_frac - dry_frac))
+    high = 5.0 + 5.0 * (gf - optimal_frac) / max(1e-6, (saturated_frac - optimal_frac))
+    out = np.where(gf <= optimal_frac, low, high)
+    out = np.where(gf <= dry_frac, 0.0, out)
+    return np.where(gf >= saturated_frac, 10.0, out)
+
+try:
+    import numba
+    _hydration_map_kernel = numba.njit(cache=True, fastmath=True)(_hydration_map_kernel)
+except Exception:  # numba not installed -> numpy path
+    pass
+
+def hydration_need_map(frac: np.ndarray,
+                       dry_frac: float = 0.05,
+                       optimal_frac: float = 0.30,
+                       saturated_frac: float = 0.70) -> np.ndarray:
+    """Vectorised hydration_need_from_fraction; returns float64 array of the input's shape."""
+    frac = np.ascontiguousarray(frac, dtype=np.float64)
+    return _hydration_map_kernel(frac, float(dry_frac), float(optimal_frac), float(saturated_frac))
+
 # -------------------------
 # Camera capture helper
 # -------------------------
 def capture_frame(timeout=5.0) -> np.ndarray:
-    cap = cv2.VideoCapture(CAM_INDEX, cv2.CAP_ANY)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
-    t0 = time.time()
-    while True:
-        ok, frame = cap.read()
-        if ok:
-            cap.release()
-            return frame
-        if time.time() - t0 > timeout:
-            cap.release()
-            raise RuntimeError("Camera capture timeout")
+    # camera stays open between requests; see camera_capture.py
+    return get_frame(CAM_INDEX, CAPTURE_WIDTH, CAPTURE_HEIGHT, timeout=timeout)
 
 # -------------------------
 # YOLO model loader (lazy)
@@ -102,10 +157,38 @@ def load_yolo_model():
         _model_names = {}
     return _model
 
+# Recent YOLO results, matched by a small thumbnail of the frame, so /hydration
+# and /snapshot polled back-to-back on an unchanged scene share one forward pass.
+YOLO_CACHE_SIZE = 8
+YOLO_CACHE_TTL = 2.0        # seconds
+YOLO_CACHE_MAX_DIFF = 2.0   # mean abs thumbnail difference (0..255) still counted as "same frame"
+_yolo_cache: List[Tuple[float, tuple, np.ndarray, Dict]] = []  # (ts, params, thumb, result)
+_yolo_cache_lock = threading.Lock()
+
+def frame_thumbnail(frame: np.ndarray) -> np.ndarray:
+    # area-averaging to 32x32 also averages away most per-pixel sensor noise
+    return cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA).astype(np.int16)
+
 def run_yolo_inference(frame: np.ndarray, conf=0.25, iou=0.45) -> Dict:
     """
     Returns dict with: areas_by_label (pixel area), boxes (list), names mapping
+    Results are reused for near-identical frames seen within YOLO_CACHE_TTL.
     """
+    params = (frame.shape, conf, iou)
+    thumb = frame_thumbnail(frame)
+    now = time.time()
+    with _yolo_cache_lock:
+        _yolo_cache[:] = [e for e in _yolo_cache if now - e[0] <= YOLO_CACHE_TTL]
+        for ts, p, t, result in _yolo_cache:
+            if p == params and np.abs(t - thumb).mean() <= YOLO_CACHE_MAX_DIFF:
+                return result
+    result = _run_yolo_uncached(frame, conf, iou)
+    with _yolo_cache_lock:
+        _yolo_cache.insert(0, (now, params, thumb, result))
+        del _yolo_cache[YOLO_CACHE_SIZE:]
+    return result
+
+def _run_yolo_uncached(frame: np.ndarray, conf: float, iou: float) -> Dict:
     model = load_yolo_model()
     results = model(frame, conf=conf, iou=iou)[0]  # take first (single) result
     h, w = frame.shape[:2]
@@ -165,7 +248,7 @@ def hydration():
             yolo_result = {"error": str(e)}
 
     # Color-based fallback/parallel
-    green_frac_color, mask = pct_green_from_bgr_image(frame)
+    green_frac_color, _ = pct_green_from_bgr_image(frame, return_mask=False)
 
     # Decide which fraction to use for final hydration_need:
     # Prefer YOLO grass_frac if available; else use color-based green_frac
@@ -222,7 +305,7 @@ def snapshot():
         green_frac_color, mask = pct_green_from_bgr_image(frame)
         overlay = visualize_mask_on_image(frame, mask, alpha=0.6)
 
-    ok, buf = cv2.imencode('.jpg', overlay)
+    ok, buf = cv2.imencode('.jpg', overlay, SNAPSHOT_JPEG_PARAMS)
     if not ok:
         return jsonify({"error": "failed to encode image"}), 500
     return Response(buf.tobytes(), mimetype='image/jpeg')
@@ -1,33 +1,85 @@
 # green_detector.py
+import threading
 import cv2
 import numpy as np
-from typing import Tuple
+from typing import Optional, Tuple
 
-def pct_green_from_bgr_image(bgr_image: np.ndarray, debug_mask: bool=False) -> Tuple[float, np.ndarray]:
+# The green fraction is a whole-frame statistic, so it is computed on a
+# downsampled copy that fits inside 320x180 (1/16 of the pixels of a 1280x720
+# frame). The aspect ratio is kept and smaller frames are never upscaled.
+ANALYSIS_SIZE = (320, 180)  # (width, height) bounding box
+
+# Default HSV thresholds for green (tweak these for your lawn)
+# H: ~35-85, S: >40, V: >40
+GREEN_LOWER = np.array([30, 40, 40])
+GREEN_UPPER = np.array([85, 255, 255])
+_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5,5))
+# The close only needs to bridge 1-px gaps left by the open; a 3x3 rect
+# close costs about nothing next to the 5x5 ellipse.
+_CLOSE_KERNEL = np.ones((3,3), np.uint8)
+
+# Module-level output buffers so repeated calls reuse the same small/hsv/mask
+# arrays instead of allocating new ones. Flask runs each request on a fresh
+# thread, so per-thread buffers never got reused; the buffers are shared
+# instead and _SCRATCH_LOCK is held for as long as they are in use (the whole
+# call is ~1 ms on a 320x180 frame).
+_SCRATCH = {}
+_SCRATCH_LOCK = threading.Lock()
+
+def _scratch(name: str, shape: tuple) -> np.ndarray:
+    """Caller must hold _SCRATCH_LOCK."""
+    buf = _SCRATCH.get(name)
+    if buf is None or buf.shape != shape:
+        buf = _SCRATCH[name] = np.empty(shape, np.uint8)
+    return buf
+
+def _analysis_shape(w: int, h: int) -> Optional[Tuple[int, int]]:
+    """(width, height) to downscale a w x h frame to, or None if it already fits."""
+    s = min(ANALYSIS_SIZE[0] / w, ANALYSIS_SIZE[1] / h)
+    if s >= 1.0:
+        return None
+    return max(1, round(w * s)), max(1, round(h * s))
+
+def pct_green_from_bgr_image(bgr_image: np.ndarray, debug_mask: bool=False,
+                             return_mask: bool=True, denoise: bool=True) -> Tuple[float, Optional[np.ndarray]]:
     """
     Compute fraction of pixels classified as 'green' using HSV thresholds.
     Returns (green_fraction [0..1], mask)
+    The mask is scaled back up to the input size; pass return_mask=False to
+    skip that when only the fraction is needed (mask is then None).
+    denoise=False skips the morphology: cheaper, but on a noisy sensor the
+    raw threshold over-counts a lot, so the fraction is not comparable to
+    the denoised one -- keep the default wherever the score drives watering.
     """
-    # Convert to HSV
-    hsv = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2HSV)
+    with _SCRATCH_LOCK:  # the scratch buffers are shared; hold it until the mask is copied out
+        h, w = bgr_image.shape[:2]
+        small = bgr_image
+        size = _analysis_shape(w, h)
+        if size is not None:
+            small = _scratch("small", (size[1], size[0], 3))
+            cv2.resize(bgr_image, size, dst=small, interpolation=cv2.INTER_AREA)
+        sh, sw = small.shape[:2]
 
-    # Default HSV thresholds for green (tweak these for your lawn)
-    # H: ~35-85, S: >40, V: >40
-    lower = np.array([30, 40, 40])
-    upper = np.array([85, 255, 255])
+        # Convert to HSV
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV, dst=_scratch("hsv", (sh, sw, 3)))
 
-    mask = cv2.inRange(hsv, lower, upper)
+        mask = cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER, dst=_scratch("mask", (sh, sw)))
 
-    # Optional morphological cleanup
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5,5))
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=1)
+        # Optional morphological cleanup (in place)
+        if denoise:
+            cv2.morphologyEx(mask, cv2.MORPH_OPEN, _KERNEL, dst=mask, iterations=1)
+            cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _CLOSE_KERNEL, dst=mask, iterations=1)
 
-    green_pixels = np.count_nonzero(mask)
-    total_pixels = mask.size
-    green_frac = green_pixels / total_pixels if total_pixels > 0 else 0.0
+        green_pixels = cv2.countNonZero(mask)  # SIMD count for 8U single-channel masks
+        total_pixels = mask.size
+        green_frac = green_pixels / total_pixels if total_pixels > 0 else 0.0
 
-    return float(green_frac), mask
+        if not return_mask:
+            return float(green_frac), None
+        # never hand the scratch buffer itself to the caller
+        if mask.shape[:2] != (h, w):
+            return float(green_frac), cv2.resize(mask, (w, h), interpolation=cv2.INTER_NEAREST)
+        return float(green_frac), mask.copy()
 
 def hydration_need_from_green_frac(green_frac: float,
                                    dry_frac: float = 0.05,
@@ -63,8 +115,17 @@ def hydration_need_from_green_frac(green_frac: float,
         # map optimal_frac..saturated_frac -> 5..10
         return 5.0 + 5.0 * (gf - optimal_frac) / max(1e-6, (saturated_frac - optimal_frac))
 
+_GREEN_FILL = {}  # shape -> solid (0,255,0) image, read-only
+
+def _green_fill(shape: tuple) -> np.ndarray:
+    img = _GREEN_FILL.get(shape)
+    if img is None:
+        img = _GREEN_FILL[shape] = np.full(shape, (0, 255, 0), np.uint8)
+    return img
+
 def visualize_mask_on_image(bgr_image: np.ndarray, mask: np.ndarray, alpha: float=0.5) -> np.ndarray:
     """Overlay mask (green) onto original image for debug/preview."""
-    overlay = bgr_image.copy()
-    overlay[mask > 0] = (0, 255, 0)  # green overlay on masked pixels
-    return cv2.addWeighted(overlay, alpha, bgr_image, 1 - alpha, 0)
+    # blend against solid green, then masked copy (C/SIMD) onto the original;
+    # same pixels as painting overlay[mask > 0] green and blending it
+    blended = cv2.addWeighted(_green_fill(bgr_image.shape), alpha, bgr_image, 1 - alpha, 0)
+    return cv2.copyTo(blended, mask, bgr_image.copy())
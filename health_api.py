@@ -1,27 +1,18 @@
 # health_api.py
 from flask import Flask, jsonify
-import requests
-import cv2
-from pathlib import Path
-from health_detector import YoloV8ONNX
+from camera_capture import snapshot_frame
+from health_detector import get_yolo, warm_yolo_async
 import os
 
-CAMERA_BASE = os.getenv("II_CAMERA_BASE", "http://127.0.0.1:5051")
+CAMERA_BASE = os.getenv("II_CAMERA_BASE", "http://127.0.0.1:5051")  # or "local"
 app = Flask(__name__)
-yolo = YoloV8ONNX()  # loads model once
 
 
 @app.get("/analyze_live")
 def analyze_live():
     try:
-        r = requests.get(f"{CAMERA_BASE}/snapshot",
-                         params={"label": "analyze"}, timeout=5)
-        r.raise_for_status()
-        p = r.json().get("path")
-        if not p or not Path(p).exists():
-            return jsonify({"ok": False, "error": "no snapshot path"}), 500
-        img = cv2.imread(p)
-        res = yolo.infer(img)
+        img = snapshot_frame(CAMERA_BASE, label="analyze", timeout=5)
+        res = get_yolo().infer(img)
         return jsonify({"ok": True, **res})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
@@ -33,4 +24,6 @@ def root():
 
 
 if __name__ == "__main__":
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # serving child, not the reloader
+        warm_yolo_async()
     app.run(port=5053, debug=True)
\ No newline at end of file
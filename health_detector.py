@@ -4,6 +4,9 @@ from __future__ import annotations
 import os
 import math
 import time
+import functools
+import threading
+import contextlib
 from pathlib import Path
 from typing import List, Dict, Tuple
 import numpy as np
@@ -11,15 +14,53 @@ import cv2
 import onnxruntime as ort
 
 # -------- Config --------
-MODEL_PATH = Path("yolov8n.onnx")            # change if different
+MODEL_PATH = Path("yolov8n_int8.onnx")       # INT8 build from quantize_model.py
+FP32_MODEL_PATH = Path("yolov8n.onnx")       # used when the INT8 file is missing
+FP16_MODEL_PATH = Path("yolov8n_fp16.onnx")  # quantize_model.py --fp16; used only on a GPU provider
 CLASSES_PATH = Path("data/models/classes.txt")
 IMG_SIZE = 640
 CONF_THRES = 0.25
 IOU_THRES = 0.45
-PROVIDERS = ["CPUExecutionProvider"]        # set to CUDA if you have it
+# Models exported with NMS in the graph (ultralytics: model.export(format="onnx",
+# nms=True)) output (1, max_det, 6) rows of x1,y1,x2,y2,score,class and skip
+# the NMS below; they are detected from the output shape.
+# tried in order, missing ones are skipped (CPU is always available)
+PROVIDERS = ["OpenVINOExecutionProvider", "DnnlExecutionProvider", "CPUExecutionProvider"]
+OPENVINO_DEVICE = os.getenv("II_OPENVINO_DEVICE", "CPU")   # CPU / GPU / NPU
+GPU_PROVIDERS = ["DmlExecutionProvider", "CUDAExecutionProvider"]  # DirectML (Windows) / CUDA
 # ------------------------
 
 
+def default_model(providers=PROVIDERS) -> Tuple[Path, List[str]]:
+    """FP16 on a GPU provider when both exist, else INT8 (or FP32) on the CPU providers."""
+    gpu = [p for p in GPU_PROVIDERS if p in ort.get_available_providers()]
+    if gpu and FP16_MODEL_PATH.exists():
+        return FP16_MODEL_PATH, gpu + ["CPUExecutionProvider"]
+    return (MODEL_PATH if MODEL_PATH.exists() else FP32_MODEL_PATH), providers
+
+
+def session_providers(preferred=PROVIDERS) -> Tuple[List[str], List[Dict]]:
+    """Keep the preferred providers this onnxruntime build has, with their options."""
+    available = set(ort.get_available_providers())
+    chosen = [p for p in preferred if p in available] or ["CPUExecutionProvider"]
+    options = [{"device_type": OPENVINO_DEVICE} if p == "OpenVINOExecutionProvider" else {}
+               for p in chosen]
+    return chosen, options
+
+
+def session_options() -> ort.SessionOptions:
+    so = ort.SessionOptions()
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # roughly one thread per physical core; SMT siblings only add contention
+    so.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+    # YOLO is a single chain of ops, so inter-op (parallel) mode has nothing to overlap
+    so.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # fixed input shape -> reuse the same allocation plan and arena every call
+    so.enable_mem_pattern = True
+    so.enable_cpu_mem_arena = True
+    return so
+
+
 def load_classes(path: Path) -> List[str]:
     if path.exists():
         return [l.strip() for l in path.read_text(encoding="utf-8").splitlines() if l.strip()]
@@ -44,91 +85,151 @@ def letterbox(im: np.ndarray, new_shape=IMG_SIZE, color=(114, 114, 114)) -> Tupl
     return im, r, (left, top)
 
 
-def xywh2xyxy(x):
-    y = np.zeros_like(x)
-    y[:, 0] = x[:, 0] - x[:, 2]/2
-    y[:, 1] = x[:, 1] - x[:, 3]/2
-    y[:, 2] = x[:, 0] + x[:, 2]/2
-    y[:, 3] = x[:, 1] + x[:, 3]/2
-    return y
+def preprocess_into(img_bgr: np.ndarray, out: np.ndarray, size=IMG_SIZE) -> Tuple[float, Tuple[int, int]]:
+    """Letterbox, then write BGR->RGB, /255, HWC->NCHW straight into out (1x3xSxS float)."""
+    img, r, pad = letterbox(img_bgr, size)
+    scale = out.dtype.type(1.0 / 255.0)
+    for c in range(3):  # RGB plane c comes from BGR channel 2-c
+        np.multiply(img[:, :, 2 - c], scale, out=out[0, c], dtype=out.dtype)
+    return r, pad
+
+
+def preprocess(img_bgr: np.ndarray, size=IMG_SIZE) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """preprocess_into a fresh 1x3xSxS float32 blob."""
+    blob = np.empty((1, 3, size, size), np.float32)
+    r, pad = preprocess_into(img_bgr, blob, size)
+    return blob, r, pad
 
 
-def nms(boxes: np.ndarray, scores: np.ndarray, iou_thres=0.45) -> List[int]:
-    # class-agnostic NMS
-    idxs = scores.argsort()[::-1]
-    keep = []
-    while idxs.size > 0:
-        i = idxs[0]
-        keep.append(i)
-        if idxs.size == 1:
-            break
-        ious = iou(boxes[i], boxes[idxs[1:]])
-        idxs = idxs[1:][ious < iou_thres]
-    return keep
+def xywh2xyxy(x, out=None):
+    # two slice ops over (N,2) halves instead of four column passes
+    y = np.empty_like(x) if out is None else out
+    half = x[:, 2:4] * 0.5
+    np.subtract(x[:, :2], half, out=y[:, :2])
+    np.add(x[:, :2], half, out=y[:, 2:4])
+    return y
+
 
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thres=0.45) -> np.ndarray:
+    """Class-agnostic NMS over xyxy boxes; kept indices, highest score first (OpenCV C++).
 
-def iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
-    inter = (np.minimum(boxes[:, 2], box[2]) - np.maximum(boxes[:, 0], box[0])).clip(0) * \
-            (np.minimum(boxes[:, 3], box[3]) -
-             np.maximum(boxes[:, 1], box[1])).clip(0)
-    area1 = (box[2]-box[0]) * (box[3]-box[1])
-    area2 = (boxes[:, 2]-boxes[:, 0]) * (boxes[:, 3]-boxes[:, 1])
-    return inter / (area1 + area2 - inter + 1e-6)
+    Zero-width/-height boxes (e.g. clipped flat against the image edge) are
+    dropped first: NMSBoxes treats two of them as fully overlapping, so which
+    ones survived would otherwise come down to its tie handling.
+    """
+    xywh = np.empty_like(boxes, dtype=np.float64)  # NMSBoxes wants x, y, w, h
+    xywh[:, :2] = boxes[:, :2]
+    np.subtract(boxes[:, 2:4], boxes[:, :2], out=xywh[:, 2:4])
+    valid = np.flatnonzero((xywh[:, 2] > 0) & (xywh[:, 3] > 0))
+    if valid.size == 0:
+        return np.empty(0, np.int64)
+    keep = cv2.dnn.NMSBoxes(xywh[valid], scores[valid].astype(np.float32), 0.0, float(iou_thres))
+    return valid[np.asarray(keep, dtype=np.int64).reshape(-1)]
 
 
 class YoloV8ONNX:
     def __init__(self, model_path=MODEL_PATH, providers=PROVIDERS):
+        if Path(model_path) == MODEL_PATH:
+            model_path, providers = default_model(providers)
         if not Path(model_path).exists():
             raise FileNotFoundError(f"Model not found: {model_path}")
-        self.sess = ort.InferenceSession(str(model_path), providers=providers)
+        providers, provider_options = session_providers(providers)
+        self.sess = ort.InferenceSession(str(model_path), sess_options=session_options(),
+                                         providers=providers, provider_options=provider_options)
         self.inp_name = self.sess.get_inputs()[0].name
+        # FP16 exports made with keep_io_types=True still take float32
+        self._is_fp16 = self.sess.get_inputs()[0].type == "tensor(float16)"
+        self._inp_dtype = np.float16 if self._is_fp16 else np.float32
+        self._free_bindings = []  # idle (input buffer, OrtValue, IOBinding) sets
+        self._bindings_lock = threading.Lock()
+        self.end2end = self.sess.get_outputs()[0].shape[-1] == 6
         self.classes = load_classes(CLASSES_PATH)
+        self._bucket = class_buckets(self.classes)
+
+    @contextlib.contextmanager
+    def _binding(self):
+        """Check out an (input buffer, OrtValue, IOBinding) set for one inference.
+
+        The input is bound once to a persistent buffer, so each infer() only
+        rewrites it in place instead of handing ORT a new array to copy.
+        Sets are pooled rather than per-thread: Flask's threaded server runs
+        every request on a fresh thread, which would never reuse one. The pool
+        only grows to the peak number of concurrent infer() calls.
+        """
+        with self._bindings_lock:
+            b = self._free_bindings.pop() if self._free_bindings else None
+        if b is None:
+            inp = np.empty((1, 3, IMG_SIZE, IMG_SIZE), self._inp_dtype)
+            ort_in = ort.OrtValue.ortvalue_from_numpy(inp)
+            io = self.sess.io_binding()
+            io.bind_ortvalue_input(self.inp_name, ort_in)
+            io.bind_output(self.sess.get_outputs()[0].name)
+            b = (inp, ort_in, io)
+        try:
+            yield b
+        finally:
+            with self._bindings_lock:
+                self._free_bindings.append(b)
+
+    def _run_bound(self, io) -> np.ndarray:
+        io.synchronize_inputs()
+        self.sess.run_with_iobinding(io)
+        return io.get_outputs()[0].numpy()
+
+    def warmup(self, runs: int = 3) -> None:
+        """Run dummy frames so kernel selection and arena growth happen before the first request."""
+        with self._binding() as (inp, _, io):
+            inp.fill(0)  # through the same IOBinding path infer() uses
+            for _ in range(runs):
+                self._run_bound(io)
 
     def infer(self, img_bgr: np.ndarray,
               conf_thres=CONF_THRES, iou_thres=IOU_THRES) -> Dict:
-        orig = img_bgr.copy()
-        h0, w0 = orig.shape[:2]
-
-        # Preprocess
-        img, r, (dw, dh) = letterbox(orig, IMG_SIZE)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = (img.astype(np.float32) /
-               255.0).transpose(2, 0, 1)[None]  # 1x3xHxW
-
-        # Inference
-        out = self.sess.run(None, {self.inp_name: img})[
-            0]  # shape (1, no, N) or (1, N, no)
+        h0, w0 = img_bgr.shape[:2]  # img_bgr is only read; letterbox makes its own copy
+
+        with self._binding() as (inp, _, io):
+            # Preprocess, into the bound 1x3xHxW input buffer
+            r, (dw, dh) = preprocess_into(img_bgr, inp, IMG_SIZE)
+            # Inference; numpy() copies the output out before the set is returned
+            out = self._run_bound(io)  # shape (1, no, N) or (1, N, no); (1, max_det, 6) if end2end
         pred = np.squeeze(out, 0)
-        if pred.shape[0] < pred.shape[1]:
-            pred = pred.T  # (N, no)
-        boxes_xywh = pred[:, :4]
-        scores_per_class = pred[:, 4:]
-
-        # Best class per candidate
-        class_ids = scores_per_class.argmax(1)
-        scores = scores_per_class.max(1)
-
-        # Filter by confidence
-        m = scores >= conf_thres
-        boxes_xywh = boxes_xywh[m]
-        scores = scores[m]
-        class_ids = class_ids[m]
-
-        if boxes_xywh.size == 0:
+        if pred.dtype != np.float32:
+            pred = pred.astype(np.float32)  # fp16 outputs -> float32 post-processing
+        if self.end2end:
+            # already NMS'd in the graph; padding rows have score 0
+            m = pred[:, 4] >= conf_thres
+            boxes = pred[m, :4].copy()
+            scores = pred[m, 4]
+            class_ids = pred[m, 5].astype(np.int64)
+        else:
+            if pred.shape[0] < pred.shape[1]:
+                pred = pred.T  # (N, no)
+            boxes_xywh = pred[:, :4]
+            scores_per_class = pred[:, 4:]
+
+            # Best class per candidate
+            class_ids = scores_per_class.argmax(1)
+            scores = scores_per_class.max(1)
+
+            # Filter by confidence
+            m = scores >= conf_thres
+            boxes = xywh2xyxy(boxes_xywh[m])
+            scores = scores[m]
+            class_ids = class_ids[m]
+
+        if boxes.size == 0:
             return {"detections": [], "hydration_score": 5.0, "meta": {"w": w0, "h": h0}}
 
-        # Convert & scale back to original image
-        boxes = xywh2xyxy(boxes_xywh)
-        # undo letterbox
-        boxes[:, [0, 2]] -= dw
-        boxes[:, [1, 3]] -= dh
-        boxes /= r
-        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w0)
-        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h0)
+        # Scale back to original image
+        # undo letterbox, in place (boxes is always a fresh array here)
+        boxes -= np.array([dw, dh, dw, dh], dtype=boxes.dtype)
+        boxes *= boxes.dtype.type(1.0 / r)
+        np.clip(boxes, 0, np.array([w0, h0, w0, h0], dtype=boxes.dtype), out=boxes)
 
         # NMS
-        keep = nms(boxes, scores, iou_thres)
-        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+        if not self.end2end:
+            keep = nms(boxes, scores, iou_thres)
+            boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
 
         # Build detections
         dets = []
@@ -143,45 +244,91 @@ class YoloV8ONNX:
                 "box_xyxy": [float(x1), float(y1), float(x2), float(y2)]
             })
 
-        score = hydration_score(dets, (w0, h0))
+        # ids past the class list get "class_N" names, which are in no bucket
+        cids = class_ids.astype(np.int64)
+        known = cids < len(self._bucket)
+        buckets = np.full(len(cids), -1, np.int8)
+        buckets[known] = self._bucket[cids[known]]
+        score = hydration_score_arrays(boxes, scores, buckets, (w0, h0))
         return {"detections": dets, "hydration_score": score, "meta": {"w": w0, "h": h0}}
 
 
-def hydration_score(dets: List[Dict], size: Tuple[int, int]) -> float:
-    """Return 0â€“10 (0=dry, 5=ok, 10=oversaturated). Uses area fractions per class."""
+_yolo_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_yolo() -> YoloV8ONNX:
+    yolo = YoloV8ONNX()
+    yolo.warmup()
+    return yolo
+
+
+def get_yolo() -> YoloV8ONNX:
+    """Process-wide warmed-up detector; use this instead of constructing YoloV8ONNX().
+
+    Loaded on first call, so importing an app that uses it stays cheap.
+    """
+    with _yolo_lock:  # a request racing warm_yolo_async() must not load a second copy
+        return _load_yolo()
+
+
+def warm_yolo_async() -> threading.Thread:
+    """Load the detector in a daemon thread so the first request doesn't pay for it."""
+    t = threading.Thread(target=get_yolo, name="yolo-warmup", daemon=True)
+    t.start()
+    return t
+
+
+# Buckets (rename here to match your labels)
+WATER_LIKE = {"water", "standing_water", "mushy_grass", "mud"}
+DRY_LIKE = {"dead_grass", "dry_soil", "brown_patch"}
+HEALTHY_LIKE = {"grass", "healthy_grass", "green_grass"}
+BUCKET_WATER, BUCKET_DRY, BUCKET_HEALTHY = 0, 1, 2
+
+
+def bucket_of(name: str) -> int:
+    if name in WATER_LIKE:
+        return BUCKET_WATER
+    if name in DRY_LIKE:
+        return BUCKET_DRY
+    if name in HEALTHY_LIKE:
+        return BUCKET_HEALTHY
+    return -1
+
+
+def class_buckets(classes: List[str]) -> np.ndarray:
+    """class_id -> bucket LUT (-1 = not counted), built once per model."""
+    return np.array([bucket_of(c) for c in classes], dtype=np.int8)
+
+
+def hydration_score_arrays(boxes: np.ndarray, confs: np.ndarray, buckets: np.ndarray,
+                           size: Tuple[int, int]) -> float:
+    """hydration_score on arrays: xyxy boxes (N,4), confidences (N,), bucket per det (N,)."""
     w, h = size
     area = w * h + 1e-6
-
-    # Buckets (rename here to match your labels)
-    water_like = {"water", "standing_water", "mushy_grass", "mud"}
-    dry_like = {"dead_grass", "dry_soil", "brown_patch"}
-    healthy_like = {"grass", "healthy_grass", "green_grass"}
-
-    frac = {"water": 0.0, "dry": 0.0, "healthy": 0.0}
-    confs = []
-
-    for d in dets:
-        x1, y1, x2, y2 = d["box_xyxy"]
-        a = max(0.0, (x2-x1)) * max(0.0, (y2-y1)) / area
-        name = d["class_name"]
-        c = d["confidence"]
-        confs.append(c)
-        if name in water_like:
-            frac["water"] += a
-        if name in dry_like:
-            frac["dry"] += a
-        if name in healthy_like:
-            frac["healthy"] += a
+    if len(boxes) == 0:
+        # Bias towards mid if nothing conclusive
+        return 5.0
+    boxes = np.asarray(boxes, dtype=np.float64)
+    a = (np.maximum(boxes[:, 2] - boxes[:, 0], 0.0) *
+         np.maximum(boxes[:, 3] - boxes[:, 1], 0.0)) / area
+    # per-bucket area sums in one pass; slot 0 collects the uncounted (-1) ones
+    frac = np.bincount(np.asarray(buckets, dtype=np.int64) + 1, weights=a, minlength=4)
+    water, dry, healthy = frac[1 + BUCKET_WATER], frac[1 + BUCKET_DRY], frac[1 + BUCKET_HEALTHY]
 
     # Simple weighted blend â†’ clamp to [0,10]
-    mean_conf = float(np.mean(confs)) if confs else 0.5
-    sat = (0.60*frac["water"] + 0.20*frac["healthy"] -
-           0.50*frac["dry"] + 0.10*mean_conf)
-    score = max(0.0, min(10.0, 10.0 * sat))
-    # Bias towards mid if nothing conclusive
-    if not dets:
-        score = 5.0
-    return float(score)
+    mean_conf = float(np.mean(np.asarray(confs, dtype=np.float64)))
+    sat = (0.60*water + 0.20*healthy -
+           0.50*dry + 0.10*mean_conf)
+    return float(max(0.0, min(10.0, 10.0 * sat)))
+
+
+def hydration_score(dets: List[Dict], size: Tuple[int, int]) -> float:
+    """Return 0â€“10 (0=dry, 5=ok, 10=oversaturated). Uses area fractions per class."""
+    boxes = np.array([d["box_xyxy"] for d in dets], dtype=np.float64).reshape(-1, 4)
+    confs = np.array([d["confidence"] for d in dets], dtype=np.float64)
+    buckets = np.array([bucket_of(d["class_name"]) for d in dets], dtype=np.int8)
+    return hydration_score_arrays(boxes, confs, buckets, size)
 
 
 # CLI test:
@@ -6,6 +6,18 @@ from typing import Optional, Dict, Any
 import cv2
 import numpy as np
 
+# HSV bands (inclusive lower/upper) for the heuristic fallback (tune for your lawn/camera)
+GREEN_BAND = (np.array([25, 40, 40]), np.array([85, 255, 255]))
+DRY_BAND = (np.array([5, 0, 80]), np.array([25, 125, 255]))      # low saturation & higher V -> straw/brown
+WATER_BAND = (np.array([90, 40, 40]), np.array([130, 255, 255]))  # strong blue-ish (puddles/reflections)
+
+
+def _band_counts(hsv: np.ndarray):
+    """Pixel counts inside each band; the three inRange passes share one mask buffer."""
+    mask = np.empty(hsv.shape[:2], np.uint8)
+    return tuple(cv2.countNonZero(cv2.inRange(hsv, lo, hi, dst=mask))
+                 for lo, hi in (GREEN_BAND, DRY_BAND, WATER_BAND))
+
 @dataclass
 class HealthResult:
     greenness_score: float   # 0..1 (1 = very green/healthy)
@@ -28,20 +40,12 @@ class HealthEvaluator:
     def _heuristic_greenness(self, bgr: np.ndarray) -> HealthResult:
         """Fallback when YOLO is not available."""
         hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
-        # Basic green mask (tune for your lawn/camera)
-        lower = np.array([25, 40, 40]); upper = np.array([85, 255, 255])
-        mask_green = cv2.inRange(hsv, lower, upper)
-        green_ratio = float(np.count_nonzero(mask_green)) / float(bgr.shape[0]*bgr.shape[1])
-
-        # Simple dry detector: low saturation & higher V → straw/brown
-        lower_dry = np.array([5, 0, 80]); upper_dry = np.array([25, 125, 255])
-        mask_dry = cv2.inRange(hsv, lower_dry, upper_dry)
-        dry_ratio = float(np.count_nonzero(mask_dry)) / float(bgr.shape[0]*bgr.shape[1])
-
-        # Simple water detector: strong blue-ish (for puddles/reflections)
-        lower_water = np.array([90, 40, 40]); upper_water = np.array([130, 255, 255])
-        mask_water = cv2.inRange(hsv, lower_water, upper_water)
-        water_ratio = float(np.count_nonzero(mask_water)) / float(bgr.shape[0]*bgr.shape[1])
+        # green / dry / water pixel counts, see the *_BAND constants above
+        n_green, n_dry, n_water = _band_counts(hsv)
+        total = float(bgr.shape[0]*bgr.shape[1])
+        green_ratio = n_green / total
+        dry_ratio = n_dry / total
+        water_ratio = n_water / total
 
         return HealthResult(
             greenness_score=max(0.0, min(1.0, green_ratio)),
@@ -4,7 +4,9 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Dict, Any
 import json
+import math
 import time
+import numpy as np
 
 @dataclass
 class Inputs:
@@ -21,6 +23,95 @@ class Inputs:
     dry_flag: bool = False
     water_flag: bool = False
 
+# Reason strings by bit of the mask returned from _compute_score, in the order
+# compute() reports them.
+REASONS = (
+    "very low soil moisture",
+    "low soil moisture",
+    "high soil moisture",
+    "very high soil moisture",
+    "recent heavy rain",
+    "rain forecast soon",
+    "very hot (>=93°F)",
+    "very humid (reduced evap)",
+    "dry/brown patches detected",
+    "standing water detected",
+)
+
+def _compute_score(sm, rain_recent, rain_soon, temp_f, hum, green, dry, water):
+    """Pure scoring math; missing sensor values are NaN. Returns (score, reason bitmask)."""
+    score = 5.0
+    mask = 0
+
+    # 1) Soil moisture dominates if present
+    if not math.isnan(sm):
+        # Normalize: assume 25-40% is good band for many lawns (tune!)
+        sm = max(0.0, min(100.0, sm))
+        if sm < 20:       score -= 3.0; mask |= 1 << 0
+        elif sm < 25:     score -= 2.0; mask |= 1 << 1
+        elif sm > 45:     score += 2.0; mask |= 1 << 2
+        elif sm > 55:     score += 3.0; mask |= 1 << 3
+
+    # 2) Weather rain history/forecast (Houston: 1–1.5 in/week target)
+    if rain_recent >= 0.75: score += 1.0; mask |= 1 << 4
+    if rain_recent >= 1.25: score += 2.0
+    if rain_soon   >= 0.25: score += 1.0; mask |= 1 << 5
+    if rain_soon   >= 0.75: score += 2.0
+
+    # 3) Temperature & humidity
+    if not math.isnan(temp_f):
+        if temp_f >= 93:
+            score -= 1.0; mask |= 1 << 6
+        if temp_f >= 100:
+            score -= 0.5
+    if not math.isnan(hum) and hum >= 85 and (0.0 if math.isnan(temp_f) else temp_f) >= 80:
+        score += 0.3; mask |= 1 << 7
+
+    # 4) Vision: greenness & flags
+    if not math.isnan(green):
+        # Greener -> slightly higher score (less urgent)
+        score += (green - 0.5) * 1.5
+    if dry:
+        score -= 1.0; mask |= 1 << 8
+    if water:
+        score += 2.0; mask |= 1 << 9
+
+    # Clamp
+    return max(0.0, min(10.0, score)), mask
+
+def _score_many(sm, rain_recent, rain_soon, temp_f, hum, green, dry, water, out_score, out_mask):
+    for i in range(sm.shape[0]):
+        out_score[i], out_mask[i] = _compute_score(sm[i], rain_recent[i], rain_soon[i], temp_f[i],
+                                                   hum[i], green[i], dry[i], water[i])
+
+# numba is optional; without it the same functions run as plain Python.
+try:
+    import numba
+    _compute_score = numba.njit(cache=True)(_compute_score)
+    _score_many = numba.njit(cache=True)(_score_many)
+except Exception:  # numba not installed
+    pass
+
+def _nan(v: Optional[float]) -> float:
+    return math.nan if v is None else float(v)
+
+def score_batch(soil_moisture_pct, ambient_temp_f, humidity_pct, rain_72h_in,
+                forecast_rain_24h_in, greenness_score, dry_flag, water_flag):
+    """compute()'s score for N scenarios at once (simulation / tuning).
+
+    Array-like arguments broadcast together; NaN marks a missing sensor.
+    Returns (scores float64[N], reason_masks uint32[N]); see REASONS.
+    """
+    arrs = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64).ravel() for a in (
+        soil_moisture_pct, rain_72h_in, forecast_rain_24h_in, ambient_temp_f,
+        humidity_pct, greenness_score, dry_flag, water_flag)))
+    arrs = [np.ascontiguousarray(a) for a in arrs]
+    n = arrs[0].shape[0]
+    scores = np.empty(n, np.float64)
+    masks = np.empty(n, np.uint32)
+    _score_many(*arrs[:6], arrs[6] != 0, arrs[7] != 0, scores, masks)
+    return scores, masks
+
 @dataclass
 class HydrationResult:
     need_score: float            # 0..10; lower = needs more water
@@ -50,47 +141,12 @@ class HydrationEngine:
         return {}
 
     def compute(self, inp: Inputs) -> HydrationResult:
-        # Start from neutral
-        score = 5.0
-        reasons = []
-
-        # 1) Soil moisture dominates if present
-        if inp.soil_moisture_pct is not None:
-            # Normalize: assume 25-40% is good band for many lawns (tune!)
-            sm = max(0.0, min(100.0, inp.soil_moisture_pct))
-            if sm < 20:       score -= 3.0; reasons.append("very low soil moisture")
-            elif sm < 25:     score -= 2.0; reasons.append("low soil moisture")
-            elif sm > 45:     score += 2.0; reasons.append("high soil moisture")
-            elif sm > 55:     score += 3.0; reasons.append("very high soil moisture")
-
-        # 2) Weather rain history/forecast (Houston: 1–1.5 in/week target)
-        rain_recent = inp.rain_72h_in
-        rain_soon   = inp.forecast_rain_24h_in
-        if rain_recent >= 0.75: score += 1.0; reasons.append("recent heavy rain")
-        if rain_recent >= 1.25: score += 2.0
-        if rain_soon   >= 0.25: score += 1.0; reasons.append("rain forecast soon")
-        if rain_soon   >= 0.75: score += 2.0
-
-        # 3) Temperature & humidity
-        if inp.ambient_temp_f is not None:
-            if inp.ambient_temp_f >= 93:
-                score -= 1.0; reasons.append("very hot (>=93°F)")
-            if inp.ambient_temp_f >= 100:
-                score -= 0.5
-        if inp.humidity_pct is not None and inp.humidity_pct >= 85 and (inp.ambient_temp_f or 0) >= 80:
-            score += 0.3; reasons.append("very humid (reduced evap)")
-
-        # 4) Vision: greenness & flags
-        if inp.greenness_score is not None:
-            # Greener -> slightly higher score (less urgent)
-            score += (inp.greenness_score - 0.5) * 1.5
-        if inp.dry_flag:
-            score -= 1.0; reasons.append("dry/brown patches detected")
-        if inp.water_flag:
-            score += 2.0; reasons.append("standing water detected")
-
-        # Clamp
-        score = max(0.0, min(10.0, score))
+        score, mask = _compute_score(_nan(inp.soil_moisture_pct), float(inp.rain_72h_in),
+                                     float(inp.forecast_rain_24h_in), _nan(inp.ambient_temp_f),
+                                     _nan(inp.humidity_pct), _nan(inp.greenness_score),
+                                     bool(inp.dry_flag), bool(inp.water_flag))
+        score = float(score)
+        reasons = [r for i, r in enumerate(REASONS) if mask >> i & 1]
 
         # Advisory
         if score <= 2.5:
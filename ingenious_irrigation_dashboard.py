@@ -1,15 +1,23 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, Response
 import os
-import base64
+import itertools
+import threading
+from collections import OrderedDict
 import cv2
-import requests
-from pathlib import Path
-from health_detector import YoloV8ONNX
+from camera_capture import snapshot_frame
+from health_detector import get_yolo, warm_yolo_async
 
 app = Flask(__name__, template_folder="templates", static_folder="static")
 
-CAMERA_BASE = os.getenv("II_CAMERA_BASE", "http://127.0.0.1:5051")
-yolo = YoloV8ONNX()  # loads your yolov8n.onnx once
+CAMERA_BASE = os.getenv("II_CAMERA_BASE", "http://127.0.0.1:5051")  # or "local"
+
+# Analysed frames are served as plain JPEG from /api/frame/<id>.jpg instead of
+# base64 inside the JSON; only the last few are kept for the page to fetch.
+FRAME_KEEP = 8
+FRAME_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 75, cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+_frames = OrderedDict()  # frame_id -> BGR frame
+_frames_lock = threading.Lock()
+_frame_ids = itertools.count(1)
 
 
 @app.route("/")
@@ -20,20 +28,33 @@ def dashboard():
 @app.get("/api/analyze_live")
 def analyze_live():
     try:
-        r = requests.get(f"{CAMERA_BASE}/snapshot",
-                         params={"label": "analyze"}, timeout=5)
-        r.raise_for_status()
-        p = r.json().get("path")
-        if not p or not Path(p).exists():
-            return jsonify({"ok": False, "error": "no snapshot"}), 500
-        img = cv2.imread(p)
-        res = yolo.infer(img)
-        ok, buf = cv2.imencode(".jpg", img)
-        b64 = base64.b64encode(buf).decode("ascii") if ok else ""
-        return jsonify({"ok": True, **res, "image_b64": "data:image/jpeg;base64," + b64})
+        img = snapshot_frame(CAMERA_BASE, label="analyze", timeout=5)
+        res = get_yolo().infer(img)
+        with _frames_lock:
+            frame_id = next(_frame_ids)
+            _frames[frame_id] = img
+            while len(_frames) > FRAME_KEEP:
+                _frames.popitem(last=False)
+        return jsonify({"ok": True, **res, "frame_id": frame_id,
+                        "image_url": f"/api/frame/{frame_id}.jpg"})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+@app.get("/api/frame/<int:frame_id>.jpg")
+def frame_jpeg(frame_id: int):
+    with _frames_lock:
+        img = _frames.get(frame_id)
+    if img is None:
+        return jsonify({"ok": False, "error": "unknown or expired frame"}), 404
+    # encoded on request, so frames the page never shows cost nothing
+    ok, buf = cv2.imencode(".jpg", img, FRAME_JPEG_PARAMS)
+    if not ok:
+        return jsonify({"ok": False, "error": "failed to encode image"}), 500
+    return Response(buf.tobytes(), mimetype="image/jpeg")
+
+
 if __name__ == "__main__":
-    app.run(port=5050, debug=True)
\ No newline at end of file
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # serving child, not the reloader
+        warm_yolo_async()
+    app.run(port=5050, debug=True)
@@ -3,7 +3,11 @@ import os
 import io
 import json
 import time
+import queue
+import threading
 import datetime as dt
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any
 
@@ -72,33 +76,197 @@ app = Flask(__name__, static_folder="static", template_folder="templates")
 def authed() -> bool:
     return request.headers.get("X-API-Key", "") == API_KEY
 
+# ============================ Image decoding ============================
+try:  # libjpeg-turbo SIMD decode straight to BGR (pip install PyTurboJPEG)
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _TJ = TurboJPEG()
+except Exception:
+    _TJ = None
+
+def decode_bgr(img_bytes: bytes) -> np.ndarray:
+    """Uploaded image bytes -> BGR uint8, without the PIL -> RGB -> BGR copies.
+
+    EXIF orientation is ignored on every path, as Image.open() did.
+    """
+    if img_bytes[:2] == b"\xff\xd8" and _TJ is not None:  # JPEG SOI marker
+        try:
+            return _TJ.decode(img_bytes, pixel_format=TJPF_BGR)
+        except Exception:
+            pass
+    img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is not None:
+        return img
+    # formats OpenCV can't read (GIF, ...)
+    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+
 # =================== YOLOv8 hydration (with safe fallback) ===================
 from ultralytics import YOLO
 _YOLO = None
 _YOLO_ERROR = None
 YOLO_WEIGHTS = os.getenv("II_YOLO_WEIGHTS", str((ROOT / "models" / "ingenious_yolov8.pt").resolve()))
+# TensorRT engines built from YOLO_WEIGHTS (see build_trt_engine.py); preferred over the .pt
+YOLO_ENGINE = os.getenv("II_YOLO_ENGINE", str((ROOT / "models" / "ingenious_yolov8.engine").resolve()))
+YOLO_INT8_ENGINE = os.getenv("II_YOLO_INT8_ENGINE", str((ROOT / "models" / "ingenious_yolov8_int8.engine").resolve()))
+YOLO_PRECISION = os.getenv("II_YOLO_PRECISION", "int8").lower()  # int8 | fp16 | fp32
+YOLO_TASK = os.getenv("II_YOLO_TASK", "detect")  # an .engine doesn't say whether it's detect or segment
+
+def _engine_candidates():
+    """Engines allowed by II_YOLO_PRECISION, fastest first; fp32 means the .pt only."""
+    return {"int8": [YOLO_INT8_ENGINE, YOLO_ENGINE], "fp16": [YOLO_ENGINE]}.get(YOLO_PRECISION, [])
+
+def _build_engine():
+    """Export YOLO_WEIGHTS to the FP16 YOLO_ENGINE on first boot; None if no GPU/TensorRT.
+
+    INT8 needs calibration images, so it is only built offline by build_trt_engine.py.
+    """
+    try:
+        from build_trt_engine import export_engine
+        print(f"[hydration] Exporting TensorRT engine from {YOLO_WEIGHTS} (one-off, takes a few minutes)")
+        return export_engine(YOLO_WEIGHTS, YOLO_ENGINE, batch=YOLO_BATCH)
+    except Exception as e:
+        print("[hydration] TensorRT export failed, using PyTorch weights:", repr(e))
+        return None
+
+_yolo_lock = threading.Lock()  # held for the whole load/export
+_yolo_warmup = None
+_yolo_warmup_lock = threading.Lock()
+
 def _load_yolo():
-    """Load YOLO weights once; remember failure so we can fall back."""
+    """Load YOLO weights once; remember failure so we can fall back.
+
+    Runs the first-boot TensorRT export if needed, which takes minutes, so call
+    it from warm_yolo_async() rather than a request.
+    """
     global _YOLO, _YOLO_ERROR
     if _YOLO is not None or _YOLO_ERROR:
         return _YOLO
+    with _yolo_lock:  # only one thread may export / load
+        if _YOLO is None and not _YOLO_ERROR:
+            _load_yolo_locked()
+    return _YOLO
+
+def _load_yolo_locked():
+    global _YOLO, _YOLO_ERROR
     try:
-        print(f"[hydration] Loading YOLO weights: {YOLO_WEIGHTS}")
-        _YOLO = YOLO(YOLO_WEIGHTS)
+        candidates = _engine_candidates()
+        engine = next((p for p in candidates if os.path.exists(p)), None)
+        task = YOLO_TASK if engine else (_build_engine() if candidates else None)
+        if task:
+            engine = engine or YOLO_ENGINE
+            print(f"[hydration] Loading TensorRT engine: {engine}")
+            model = YOLO(engine, task=task)
+        else:
+            print(f"[hydration] Loading YOLO weights: {YOLO_WEIGHTS}")
+            model = YOLO(YOLO_WEIGHTS)
+            model.fuse()  # fold Conv+BN once up front
+        # first forward pays for cuDNN autotune / engine context setup; do it now
+        model.predict(np.zeros((640, 640, 3), np.uint8), imgsz=640, conf=0.25, verbose=False)
+        _YOLO = model  # publish only once it is warmed up
         print("[hydration] YOLO loaded. Classes:", _YOLO.names)
     except Exception as e:
         _YOLO_ERROR = e
         print("[hydration] YOLO load failed, falling back to HSV method:", repr(e))
+
+def warm_yolo_async() -> threading.Thread:
+    """Load (and if needed export) the model in a daemon thread, once."""
+    global _yolo_warmup
+    with _yolo_warmup_lock:
+        if _yolo_warmup is None:
+            _yolo_warmup = threading.Thread(target=_load_yolo, name="yolo-warmup", daemon=True)
+            _yolo_warmup.start()
+    return _yolo_warmup
+
+def _ready_yolo():
+    """The model if it is loaded, else None (HSV fallback) after making sure it is loading."""
+    if _YOLO is None and not _YOLO_ERROR:
+        warm_yolo_async()
     return _YOLO
 
+# ---- Micro-batching: concurrent requests share one model.predict() call ----
+YOLO_BATCH = int(os.getenv("II_YOLO_BATCH", "8"))
+YOLO_BATCH_WAIT = float(os.getenv("II_YOLO_BATCH_WAIT_MS", "15")) / 1000.0
+_predict_q: "queue.Queue[tuple[np.ndarray, Future]]" = queue.Queue()
+_predict_worker = None
+_predict_worker_lock = threading.Lock()
+
+def _inference_mode():
+    """torch.inference_mode() (no autograd bookkeeping); a no-op context without torch."""
+    try:
+        import torch
+        return torch.inference_mode()
+    except Exception:
+        import contextlib
+        return contextlib.nullcontext()
+
+def _predict_loop():
+    while True:
+        batch = [_predict_q.get()]
+        deadline = time.monotonic() + YOLO_BATCH_WAIT
+        while len(batch) < YOLO_BATCH:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                batch.append(_predict_q.get(timeout=left))
+            except queue.Empty:
+                break
+        try:
+            with _inference_mode():
+                results = _YOLO.predict([img for img, _ in batch], imgsz=640, conf=0.25, verbose=False)
+            for (_, fut), res in zip(batch, results):
+                fut.set_result(res)
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+
+def _predict_batched(img_rgb: np.ndarray):
+    """Queue one image for the batch worker and wait for its Results."""
+    global _predict_worker
+    if _predict_worker is None:
+        with _predict_worker_lock:
+            if _predict_worker is None:
+                _predict_worker = threading.Thread(target=_predict_loop, name="yolo-batch", daemon=True)
+                _predict_worker.start()
+    fut = Future()
+    _predict_q.put((img_rgb, fut))
+    return fut.result()
+
+# HSV fallback bands (OpenCV H is 0..179)
+_HSV_GREEN = (np.array([35, 60, 40], dtype=np.uint8), np.array([85, 255, 255], dtype=np.uint8))
+_HSV_BLUE = (np.array([90, 40, 40], dtype=np.uint8), np.array([140, 255, 255], dtype=np.uint8))
+# UMat only pays off with a real OpenCL device; on the CPU fallback it is ~20% slower
+_USE_OPENCL = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+
+def _lerp3(xs, ys):
+    """np.interp over 3 knots for one float, as clamped segments with precomputed slopes."""
+    (x0, x1, x2), (y0, y1, y2) = xs, ys
+    s1, s2 = (y1 - y0) / (x1 - x0), (y2 - y1) / (x2 - x1)
+    def f(x: float) -> float:
+        return y0 + s1 * max(0.0, min(x, x1) - x0) + s2 * max(0.0, min(x, x2) - x1)
+    return f
+
+_yolo_baseline = _lerp3((0.05, 0.30, 0.60), (1.0, 5.0, 8.0))
+_yolo_dead_penalty = _lerp3((0.00, 0.10, 0.30), (0.0, 1.0, 2.5))
+_hsv_baseline = _lerp3((0.10, 0.35, 0.70), (0.0, 5.0, 8.0))
+
+def _hydration_buckets(names: Dict[int, str]) -> np.ndarray:
+    """class id -> 0 grass / 1 water / 2 dead grass / 3 anything else."""
+    bucket = np.full(max(names, default=-1) + 1, 3, np.intp)
+    for cls, cname in names.items():
+        if cname == "grass": bucket[cls] = 0
+        elif cname == "water": bucket[cls] = 1
+        elif cname in ("dead_grass", "dead-grass", "dead grass"): bucket[cls] = 2
+    return bucket
+
 def bgr_to_hydration(img_bgr: np.ndarray) -> Dict[str, Any]:
     """Return hydration state (0â€“10) plus class ratios."""
-    # Try YOLO first
-    model = _load_yolo()
+    # Try YOLO first; HSV until the background load has finished
+    model = _ready_yolo()
     if model is not None:
         try:
             img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-            res = model.predict(img_rgb, imgsz=640, conf=0.25, verbose=False)[0]
+            res = _predict_batched(img_rgb)
             names = res.names  # {id: "class_name"}
             H, W = img_rgb.shape[:2]
             total_pixels = float(H * W)
@@ -107,31 +275,29 @@ def bgr_to_hydration(img_bgr: np.ndarray) -> Dict[str, Any]:
             boxes = getattr(res, "boxes", []) or []
             grass_area = water_area = dead_area = 0.0
 
-            # If masks are present and have .data, iterate masks paired with boxes,
-            # otherwise fall back to using box coordinates only. Use safe defaults
-            # so we never attempt to iterate over None.
-            if masks is not None and getattr(masks, "data", None) is not None:
-                for mask, box in zip(masks.data, boxes):
-                    cls = int(box.cls[0].item()); cname = names.get(cls, "")
-                    pixels = float(mask.sum().item())
-                    if cname == "grass": grass_area += pixels
-                    elif cname == "water": water_area += pixels
-                    elif cname in ("dead_grass", "dead-grass", "dead grass"): dead_area += pixels
-            else:
-                for box in boxes:
-                    cls = int(box.cls[0].item()); cname = names.get(cls, "")
-                    x1,y1,x2,y2 = box.xyxy[0].tolist()
-                    area = max(0.0, (x2 - x1)) * max(0.0, (y2 - y1))
-                    if cname == "grass": grass_area += area
-                    elif cname == "water": water_area += area
-                    elif cname in ("dead_grass", "dead-grass", "dead grass"): dead_area += area
+            # Per-instance area: mask pixels if masks are present, else box area.
+            # Reduced on the device and copied to the host once, rather than an
+            # .item() sync per detection; then summed per class with bincount.
+            if len(boxes):
+                if masks is not None and getattr(masks, "data", None) is not None:
+                    n = min(len(masks.data), len(boxes))  # zip() semantics
+                    areas = masks.data[:n].sum(dim=(1, 2)).float().cpu().numpy()
+                else:
+                    n = len(boxes)
+                    xyxy = boxes.xyxy
+                    areas = ((xyxy[:, 2] - xyxy[:, 0]).clamp(min=0) *
+                             (xyxy[:, 3] - xyxy[:, 1]).clamp(min=0)).float().cpu().numpy()
+                cls = boxes.cls[:n].view(-1).long().cpu().numpy()
+                bucket = _hydration_buckets(names)
+                agg = np.bincount(bucket[cls], weights=areas, minlength=4)
+                grass_area, water_area, dead_area = (float(a) for a in agg[:3])
 
             green_ratio = float(min(1.0, grass_area / total_pixels))
             water_ratio = float(min(1.0, water_area / total_pixels))
             dead_ratio  = float(min(1.0, dead_area  / total_pixels))
 
-            baseline = np.interp(green_ratio, [0.05, 0.30, 0.60], [1.0, 5.0, 8.0])
-            penalty  = np.interp(dead_ratio,  [0.00, 0.10, 0.30], [0.0,  1.0, 2.5])
+            baseline = _yolo_baseline(green_ratio)
+            penalty  = _yolo_dead_penalty(dead_ratio)
             hydration = baseline - penalty
             if water_ratio >= 0.03:
                 hydration = max(hydration, 9.0 + min(1.0, (water_ratio - 0.03) * 30))  # 9..10
@@ -148,22 +314,20 @@ def bgr_to_hydration(img_bgr: np.ndarray) -> Dict[str, Any]:
             print("[hydration] YOLO inference failed; falling back. Error:", repr(e))
 
     # --------------------- Fallback: HSV greenness method ---------------------
-    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
-    green_low  = np.array([35, 60, 40], dtype=np.uint8)
-    green_high = np.array([85, 255, 255], dtype=np.uint8)
-    green_mask = cv2.inRange(hsv, green_low, green_high)
-
-    blue_low  = np.array([90, 40, 40], dtype=np.uint8)
-    blue_high = np.array([140, 255, 255], dtype=np.uint8)
-    blue_mask = cv2.inRange(hsv, blue_low, blue_high)
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    src = cv2.UMat(img_bgr) if _USE_OPENCL else img_bgr  # T-API keeps intermediates on the GPU
+    hsv = cv2.cvtColor(src, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, *_HSV_GREEN)
+    n_green = cv2.countNonZero(mask)
+    cv2.inRange(hsv, *_HSV_BLUE, dst=mask)  # reuse the green mask's buffer
+    gray = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
     dark_mask = cv2.threshold(gray, 40, 255, cv2.THRESH_BINARY_INV)[1]
+    n_water = cv2.countNonZero(cv2.bitwise_or(mask, dark_mask, dst=mask))
 
     total = img_bgr.shape[0] * img_bgr.shape[1]
-    green_ratio = float(np.count_nonzero(green_mask)) / total
-    water_ratio = float(np.count_nonzero(cv2.bitwise_or(blue_mask, dark_mask))) / total
+    green_ratio = float(n_green) / total
+    water_ratio = float(n_water) / total
 
-    hydration = np.interp(green_ratio, [0.10, 0.35, 0.70], [0.0, 5.0, 8.0])
+    hydration = _hsv_baseline(green_ratio)
     if water_ratio >= 0.06:
         hydration = max(hydration, 9.0 + min(1.0, (water_ratio - 0.06) * 20))
     hydration = float(round(np.clip(hydration, 0, 10), 2))
@@ -176,17 +340,89 @@ def bgr_to_hydration(img_bgr: np.ndarray) -> Dict[str, Any]:
     }
 
 # ============================ Logging helpers ============================
+# Last RECENT_KEEP entries kept in memory, so /api/hydration/log doesn't re-read the file
+RECENT_KEEP = 500
+_RECENT = None  # deque, filled from the end of LOG on first use
+_LOG_CUT = False  # LOG's last line has no newline (crash mid-write); start a fresh one
+_recent_lock = threading.Lock()
+
+def _read_tail_lines(path: Path, n: int, block: int = 65536):
+    """Last n lines of path, reading backwards in blocks instead of the whole file."""
+    with path.open("rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines()
+    if pos > 0:
+        lines = lines[1:]  # first line is probably cut
+    return lines[-n:]
+
+def _parse_log_lines(lines):
+    """Decoded entries of JSONL lines, skipping blank, truncated or corrupt ones."""
+    out = []
+    for x in lines:
+        if not x.strip():
+            continue
+        try:
+            out.append(json.loads(x))
+        except ValueError:  # JSONDecodeError / UnicodeDecodeError
+            pass
+    return out
+
+def _recent():
+    global _RECENT, _LOG_CUT
+    if _RECENT is None:
+        recent = deque(maxlen=RECENT_KEEP)
+        try:
+            if LOG.exists():
+                recent.extend(_parse_log_lines(_read_tail_lines(LOG, RECENT_KEEP)))
+                with LOG.open("rb") as f:
+                    if f.seek(0, os.SEEK_END):
+                        f.seek(-1, os.SEEK_END)
+                        _LOG_CUT = f.read(1) != b"\n"
+        except OSError as e:  # an unreadable log must not fail the write path
+            print("[hydration] could not read recent log entries:", repr(e))
+        _RECENT = recent
+    return _RECENT
+
+# Disk writes happen off the request thread: uploads on a small pool, log lines
+# on a single worker so they land in the file in the order they were logged.
+_IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-io")
+_LOG_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-io")
+
+def _report_io_error(fut) -> None:
+    # Nobody waits on these futures, so surface failures here instead of
+    # letting the executor swallow them.
+    exc = fut.exception()
+    if exc is not None:
+        print("[hydration] background write failed:", repr(exc))
+
+def _append_log_line(line: str) -> None:
+    with LOG.open("a", encoding="utf-8") as f:
+        f.write(line)
+
 def log_hydration(entry: Dict[str, Any]) -> None:
+    global _LOG_CUT
     entry = dict(entry)
     entry["ts"] = dt.datetime.utcnow().isoformat() + "Z"
-    with LOG.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(entry) + "\n")
+    with _recent_lock:
+        recent = _recent()
+        line = json.dumps(entry) + "\n"
+        if _LOG_CUT:
+            line, _LOG_CUT = "\n" + line, False
+        _LOG_POOL.submit(_append_log_line, line).add_done_callback(_report_io_error)
+        recent.append(entry)  # visible to /api/hydration/log straight away
 
 def tail_log(n=200):
-    if not LOG.exists():
-        return []
-    lines = LOG.read_text(encoding="utf-8").splitlines()[-n:]
-    return [json.loads(x) for x in lines if x.strip()]
+    with _recent_lock:
+        recent = list(_recent())
+    if n > RECENT_KEEP and LOG.exists():  # more than we keep: go to the file
+        return _parse_log_lines(_read_tail_lines(LOG, n))
+    return recent[-n:] if n > 0 else []
 
 # =============================== Web UI ===============================
 @app.get("/")
@@ -231,6 +467,20 @@ def api_set_zone_duration(zone: int):
     return jsonify({"ok": bool(ok), "zone": zone, "minutes": minutes})
 
 # ============================ Hydration API ============================
+try:  # xxh3 is SIMD and ~10x faster than blake2b; the stdlib hash is the fallback
+    import xxhash
+    def _upload_key(data: bytes) -> int:
+        return xxhash.xxh3_64_intdigest(data)
+except Exception:
+    import hashlib
+    def _upload_key(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+# raw upload hash -> result, so client retries of the same image skip decode + YOLO
+RESULT_CACHE_SIZE = 256
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
 @app.post("/api/hydration/analyze")
 def api_hydration_analyze():
     """Accepts multipart 'image' file or raw bytes; returns hydration."""
@@ -243,20 +493,31 @@ def api_hydration_analyze():
         fname = secure_filename(file.filename or f"upload_{int(time.time())}.png")
         raw = file.read()
         img_bytes = raw
-        (UPLOADS / fname).write_bytes(raw)
+        _IO_POOL.submit((UPLOADS / fname).write_bytes, raw).add_done_callback(_report_io_error)
     else:
         img_bytes = request.get_data()
 
     if not img_bytes:
         return jsonify({"error": "no image received"}), 400
 
-    try:
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-        img_bgr = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    except Exception as e:
-        return jsonify({"error": f"decode failed: {e}"}), 400
-
-    res = bgr_to_hydration(img_bgr)
+    key = _upload_key(img_bytes)
+    with _result_cache_lock:
+        res = _result_cache.get(key)
+        if res is not None:
+            _result_cache.move_to_end(key)
+    if res is None:
+        try:
+            img_bgr = decode_bgr(img_bytes)
+        except Exception as e:
+            return jsonify({"error": f"decode failed: {e}"}), 400
+        res = bgr_to_hydration(img_bgr)
+        # cache HSV results only once YOLO is known to be unavailable, not while
+        # it is still loading or after a one-off predict failure
+        if res["backend"] != "hsv" or _YOLO_ERROR:
+            with _result_cache_lock:
+                _result_cache[key] = res
+                while len(_result_cache) > RESULT_CACHE_SIZE:
+                    _result_cache.popitem(last=False)
     log_hydration({"source": "upload", **res})
     return jsonify(res)
 @app.get("/api/hydration/log")
@@ -266,6 +527,8 @@ def api_hydration_log():
     return jsonify(tail_log(200))
 
 if __name__ == "__main__":
-    # Tip: set II_YOLO_WEIGHTS to your .pt path if not using the default.
+    # Tip: set II_YOLO_WEIGHTS to your .pt path if not using the default
+    # II_YOLO_PRECISION=int8|fp16|fp32 picks the TensorRT engine (or the .pt for fp32).
+    warm_yolo_async()  # requests use the HSV method until this finishes
     app.run(host="0.0.0.0", port=5000)
 
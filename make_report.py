@@ -17,6 +17,7 @@ import argparse
 import csv
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Tuple
 import matplotlib.pyplot as plt
@@ -27,18 +28,34 @@ CLASSES = [
 ]
 
 
+def _count_chunk(files: List[Path]) -> List[int]:
+    """Per-class-id label counts for a list of label files. Runs in a worker process."""
+    per_id = [0] * len(CLASSES)
+    for txt in files:
+        # stream the file; only the first token (class id) of each line matters
+        with txt.open("r", encoding="utf-8", buffering=1 << 16) as f:
+            for line in f:
+                head = line.split(None, 1)
+                if not head:
+                    continue
+                cid = int(head[0])
+                if 0 <= cid < len(CLASSES):
+                    per_id[cid] += 1
+    return per_id
+
+
 def count_labels(label_dir: Path) -> Dict[str, int]:
-    counts = {c: 0 for c in CLASSES}
-    if not label_dir.exists():
-        return counts
-    for txt in label_dir.glob("*.txt"):
-        for line in txt.read_text().strip().splitlines():
-            if not line.strip():
-                continue
-            cid = int(line.split()[0])
-            if 0 <= cid < len(CLASSES):
-                counts[CLASSES[cid]] += 1
-    return counts
+    files = sorted(label_dir.glob("*.txt")) if label_dir.exists() else []
+    # files are independent, so split them over the cores; below a few hundred
+    # the process pool's startup costs more than it saves
+    workers = os.cpu_count() or 1
+    if len(files) < 500 or workers == 1:
+        per_id = _count_chunk(files)
+    else:
+        chunks = [files[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_id = [sum(col) for col in zip(*pool.map(_count_chunk, chunks))]
+    return dict(zip(CLASSES, per_id))
 
 
 def latest_results_csv(runs_dir: Path) -> Path | None:
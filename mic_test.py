@@ -5,10 +5,13 @@ SR = 16000
 print("Recording", DURATION, "s from device", DEVICE)
 rec = sd.rec(int(DURATION * SR), samplerate=SR, channels=1, dtype='int16', device=DEVICE)
 sd.wait()
-data = rec.tobytes()
-with wave.open("mic_test.wav", "wb") as f:
-    f.setnchannels(1)
-    f.setsampwidth(2)
-    f.setframerate(SR)
-    f.writeframes(data)
+try:  # libsndfile writes straight from the array
+    import soundfile as sf
+    sf.write("mic_test.wav", rec, SR, subtype="PCM_16")
+except ImportError:
+    with wave.open("mic_test.wav", "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SR)
+        f.writeframes(memoryview(rec).cast("B"))  # no tobytes() copy
 print("Saved mic_test.wav — play it to confirm audio.")
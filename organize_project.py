@@ -1,6 +1,8 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 
 ROOT = os.path.abspath(os.path.dirname(__file__))
 
@@ -25,6 +27,10 @@ DOWNLOADS = [
 ]
     # Add more URLs here
 
+# downloads run in parallel; share one pooled keep-alive session between them
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
 def download_file(url):
     filename = url.split("/")[-1]
     ext = os.path.splitext(filename)[1].lower()
@@ -39,29 +45,51 @@ def download_file(url):
         print(f"Already exists: {filename}")
         return
 
+    tmp_path = dest_path + ".part"  # so a failed download isn't mistaken for "Already exists"
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        with open(dest_path, 'wb') as f:
-            f.write(response.content)
+        with session.get(url, stream=True, timeout=10) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
+        os.replace(tmp_path, dest_path)
         print(f"Downloaded: {filename} â†’ {FOLDERS[ext]}")
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         print(f"Failed to download {filename}: {e}")
 
 # ðŸ” Download assets
-for url in DOWNLOADS:
-    download_file(url)
+# each download is network-bound, so overlap them
+with ThreadPoolExecutor(max_workers=max(1, min(8, len(DOWNLOADS)))) as ex:
+    list(ex.map(download_file, DOWNLOADS))
 
 # ðŸ”„ Organize local files
-for dirpath, _, filenames in os.walk(ROOT):
-    for file in filenames:
-        ext = os.path.splitext(file)[1].lower()
-        if ext in FOLDERS:
-            src = os.path.join(dirpath, file)
-            dst = os.path.join(ROOT, FOLDERS[ext], file)
-            if os.path.abspath(src) != os.path.abspath(dst):
-                try:
-                    shutil.move(src, dst)
-                    print(f"Moved: {file} â†’ {FOLDERS[ext]}")
-                except Exception as e:
-                    print(f"Failed to move {file}: {e}")
\ No newline at end of file
+def iter_files(top):
+    """Yield file DirEntries under top; like os.walk, but uses each entry's cached type."""
+    with os.scandir(top) as it:
+        for entry in it:
+            if entry.is_dir():
+                if not entry.is_symlink():  # os.walk(followlinks=False)
+                    yield from iter_files(entry.path)
+            else:
+                yield entry
+
+def move_file(src, dst):
+    try:
+        os.rename(src, dst)  # one syscall on the same filesystem
+    except OSError:  # other drive, or dst exists on Windows
+        shutil.move(src, dst)
+
+for entry in iter_files(ROOT):
+    file = entry.name
+    ext = os.path.splitext(file)[1].lower()
+    if ext in FOLDERS:
+        src = entry.path
+        dst = os.path.join(ROOT, FOLDERS[ext], file)
+        if os.path.abspath(src) != os.path.abspath(dst):
+            try:
+                move_file(src, dst)
+                print(f"Moved: {file} â†’ {FOLDERS[ext]}")
+            except Exception as e:
+                print(f"Failed to move {file}: {e}")
\ No newline at end of file
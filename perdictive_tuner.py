@@ -9,15 +9,9 @@ class PredictiveTuner:
         if len(history) < 3:
             return None  # Not enough data
 
-        # Analyze last 3 results
-        deltas = []
-        for i in range(1, 3):
-            prev = history[-i - 1]
-            curr = history[-i]
-            delta = curr["green"] - prev["green"]
-            deltas.append(delta)
-
-        avg_delta = sum(deltas) / len(deltas)
+        # Analyze last 3 results: mean of the two most recent green deltas
+        g3, g2, g1 = history[-3]["green"], history[-2]["green"], history[-1]["green"]
+        avg_delta = ((g1 - g2) + (g2 - g3)) / 2
         if avg_delta < 0:
             return "Increase watering next time"
         elif avg_delta > 0:
@@ -6,6 +6,7 @@ Ingenious Irrigation - Retrofit Controller (pass-through by default)
 - Optional AC-detect inputs tell us when legacy controller is calling a zone
 """
 
+import os
 import time
 import json
 import signal
@@ -70,6 +71,18 @@ def set_relay(zone_idx: int, block: bool):
         GPIO.output(pin, GPIO.HIGH if block else GPIO.LOW)
 
 
+_BLOCK_LEVEL = GPIO.LOW if RELAY_ACTIVE_LOW else GPIO.HIGH
+_PASS_LEVEL = GPIO.HIGH if RELAY_ACTIVE_LOW else GPIO.LOW
+
+
+def set_relays(blocks):
+    """Like set_relay for every zone at once (Zone 1..8 order); one GPIO.output call."""
+    GPIO.output(RELAY_PINS, [_BLOCK_LEVEL if b else _PASS_LEVEL for b in blocks])
+
+
+_overrides_cache = (None, None)  # ((mtime_ns, size), parsed overrides)
+
+
 def read_overrides():
     """Read override policy from JSON, e.g.:
     {
@@ -80,12 +93,27 @@ def read_overrides():
         "3": {"shorten_secs": 300}
       }
     }
+
+    The parsed file is reused until its mtime/size changes, so the 10 Hz
+    poll loop doesn't re-parse JSON on every pass.
     """
+    global _overrides_cache
+    try:
+        st = os.stat(OVERRIDE_FILE)
+    except OSError:
+        return {"global_skip": False, "zones": {}}
+    key = (st.st_mtime_ns, st.st_size)
+    if _overrides_cache[0] == key:
+        return _overrides_cache[1]
     try:
         with open(OVERRIDE_FILE, "r") as f:
-            return json.load(f)
+            data = json.load(f)
     except Exception:
-        return {"global_skip": False, "zones": {}}
+        # half-written or malformed: cache the default too, so a broken file
+        # isn't re-parsed every poll; the next save changes the key
+        data = {"global_skip": False, "zones": {}}
+    _overrides_cache = (key, data)
+    return data
 
 
 def is_legacy_calling(zone_idx: int) -> bool:
@@ -107,8 +135,7 @@ def block_all_except(zone_idx: int):
 
 def graceful_exit(*_):
     log_event("Exiting, restoring pass-through on all zones.")
-    for i in range(len(RELAY_PINS)):
-        set_relay(i, block=False)
+    set_relays([False] * len(RELAY_PINS))
     GPIO.cleanup()
     sys.exit(0)
 
@@ -128,6 +155,7 @@ while True:
     global_skip = overrides.get("global_skip", False)
     zone_over = overrides.get("zones", {})
 
+    desired = [False] * len(RELAY_PINS)
     for z in range(len(RELAY_PINS)):
         calling = is_legacy_calling(z)
 
@@ -161,6 +189,7 @@ while True:
                 del shorten_deadlines[z]
             desired_block = False
 
-        set_relay(z, block=desired_block)
+        desired[z] = desired_block
 
+    set_relays(desired)
     time.sleep(POLL_SEC)
\ No newline at end of file
@@ -154,16 +154,18 @@ def remove_pyc():
 
 
 def move_files():
-    for src_name, dest_rel in FILE_MAP.items():
-        src = ROOT / src_name
-        dest = ROOT / dest_rel
-        if not src.exists():
-            # silent skip if missing
-            continue
-        dest.parent.mkdir(parents=True, exist_ok=True)
+    # silent skip if missing
+    moves = [(name, rel, ROOT / name, ROOT / rel) for name, rel in FILE_MAP.items()
+             if (ROOT / name).exists()]
+    for parent in {dest.parent for _, _, _, dest in moves}:
+        parent.mkdir(parents=True, exist_ok=True)
+    for src_name, dest_rel, src, dest in moves:
         print(f"Moving {src_name} -> {dest_rel}")
         try:
-            shutil.move(str(src), str(dest))
+            try:
+                os.replace(src, dest)  # one rename(), however big the file
+            except OSError:  # other drive, or dest is an existing dir
+                shutil.move(str(src), str(dest))
         except Exception as e:
             print(f"  ! Failed to move {src_name}: {e}")
 
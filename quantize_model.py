@@ -0,0 +1,93 @@
+# quantize_model.py
+# Offline INT8 (QDQ, per-channel) quantisation of the YOLOv8 ONNX model used by
+# health_detector.py. Calibrates on real lawn images so the activation ranges
+# match what the camera sees.
+#
+#   python quantize_model.py --images dataset_raw --n 100
+#   python quantize_model.py --fp16        # FP16 copy for DirectML / CUDA
+from __future__ import annotations
+import argparse
+import os
+import random
+from pathlib import Path
+
+import cv2
+from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                      QuantType, quantize_static)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from health_detector import FP16_MODEL_PATH, FP32_MODEL_PATH, IMG_SIZE, MODEL_PATH, preprocess
+
+IMG_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def list_images(root: Path, n: int) -> list[str]:
+    paths = [os.path.join(d, f) for d, _, files in os.walk(root)
+             for f in files if f.lower().endswith(IMG_EXTS)]
+    random.Random(0).shuffle(paths)
+    return paths[:n]
+
+
+class LawnCalibrationReader(CalibrationDataReader):
+    """Feeds images through the same preprocess() as YoloV8ONNX.infer."""
+
+    def __init__(self, image_paths: list[str], input_name: str):
+        self.input_name = input_name
+        self._paths = iter(image_paths)
+
+    def get_next(self):
+        for p in self._paths:
+            img = cv2.imread(p)
+            if img is None:
+                continue
+            blob, _, _ = preprocess(img, IMG_SIZE)
+            return {self.input_name: blob}
+        return None
+
+
+def convert_fp16(model: str, out: str) -> None:
+    import onnx
+    from onnxconverter_common import float16
+    # keep_io_types: the graph runs in fp16 but still takes/returns float32
+    onnx.save(float16.convert_float_to_float16(onnx.load(model), keep_io_types=True), out)
+    print(f"[OK] {out} (fp16)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", help="Folder of representative lawn images (INT8 calibration)")
+    ap.add_argument("--model", default=str(FP32_MODEL_PATH))
+    ap.add_argument("--out", default=None, help=f"default: {MODEL_PATH} (INT8) / {FP16_MODEL_PATH} (--fp16)")
+    ap.add_argument("--n", type=int, default=100, help="Number of calibration images")
+    ap.add_argument("--fp16", action="store_true", help="Write an FP16 model instead of INT8")
+    args = ap.parse_args()
+
+    if args.fp16:
+        convert_fp16(args.model, args.out or str(FP16_MODEL_PATH))
+        return
+    if not args.images:
+        ap.error("--images is required for INT8 calibration")
+    args.out = args.out or str(MODEL_PATH)
+
+    paths = list_images(Path(args.images), args.n)
+    if not paths:
+        raise SystemExit(f"No images found under {args.images}")
+
+    # fold Conv+BN, fuse activations and run shape inference before quantising
+    # (the export has static shapes, so the sympy-based symbolic pass is skipped)
+    pre = Path(args.out).with_suffix(".pre.onnx")
+    quant_pre_process(args.model, str(pre), skip_symbolic_shape=True)
+
+    import onnxruntime as ort
+    inp_name = ort.InferenceSession(str(pre), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(str(pre), args.out, LawnCalibrationReader(paths, inp_name),
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=True)
+    pre.unlink(missing_ok=True)
+    print(f"[OK] {args.out} (calibrated on {len(paths)} images)")
+
+
+if __name__ == "__main__":
+    main()
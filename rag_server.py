@@ -1,16 +1,29 @@
 import os
+import time
+import queue
+import hashlib
 import logging
+import threading
+from concurrent.futures import Future
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
+from embeddings import EMBED_MODEL, embed
 
 # ðŸ”§ Load environment variables
 load_dotenv()
 RAG_PORT = int(os.getenv("RAG_PORT", 5052))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# faiss.index_factory string, e.g. "Flat", "SQ8", "HNSW32,SQfp16", "IVF256,PQ16"; empty = pick by corpus size
+RAG_INDEX = os.getenv("RAG_INDEX", "")
+RAG_EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", 32))  # HNSW search breadth
+RAG_NPROBE = int(os.getenv("RAG_NPROBE", 8))  # IVF lists visited per query
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+RAG_BATCH = int(os.getenv("RAG_BATCH", 32))  # max queries embedded together
+RAG_BATCH_WAIT = float(os.getenv("RAG_BATCH_WAIT_MS", 5)) / 1000.0
+RAG_GPU = os.getenv("RAG_GPU", "1") != "0"  # search on GPU 0 when faiss-gpu sees one
 
 # ðŸ“œ Logging
 logging.basicConfig(
@@ -28,21 +41,113 @@ documents = [
     "Watering schedules should adapt to seasonal changes."
 ]
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
-doc_embeddings = model.encode(documents)
-index = faiss.IndexFlatL2(doc_embeddings.shape[1])
-index.add(np.array(doc_embeddings))
+
+def build_index(embeddings: np.ndarray, factory: str):
+    """Inner-product index (embeddings are L2-normalised, so IP == cosine)."""
+    index = faiss.index_factory(embeddings.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:  # IVF / PQ learn their centroids from the corpus
+        index.train(embeddings)
+    index.add(embeddings)
+    return index
+
+
+_gpu_res = None  # must outlive the GPU index that uses it
+
+
+def to_gpu(index):
+    """Copy the index to GPU 0 if faiss-gpu and a device are present; else return it unchanged."""
+    global _gpu_res
+    if not RAG_GPU or not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() < 1:
+        return index
+    try:
+        _gpu_res = _gpu_res or faiss.StandardGpuResources()
+        gpu_index = faiss.index_cpu_to_gpu(_gpu_res, 0, index)
+        logger.info("FAISS index moved to GPU 0")
+        return gpu_index
+    except Exception as e:  # e.g. HNSW has no GPU version
+        logger.info(f"FAISS index stays on CPU: {e}")
+        return index
+
+
+def load_or_build_index(docs, factory: str):
+    """Reuse the index saved for exactly these docs + model + factory, else embed and save."""
+    key = hashlib.sha1("\0".join([EMBED_MODEL, factory, *docs]).encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(RAG_INDEX_DIR, f"rag_{key}.faiss")
+    if os.path.exists(path):
+        logger.info(f"Loading FAISS index {path}")
+        return faiss.read_index(path)
+    emb = embed(docs, batch_size=32)
+    index = build_index(emb, factory)
+    try:
+        os.makedirs(RAG_INDEX_DIR, exist_ok=True)
+        faiss.write_index(index, path)
+    except Exception as e:
+        logger.warning(f"Could not save FAISS index: {e}")
+    return index
+
+
+# Module-level singletons shared by all Flask worker threads. Exact search is
+# fastest for a small corpus; the HNSW graph only pays off past ~10^3 docs, and
+# there fp16 codes halve the stored vectors at no measurable recall cost.
+# (not "index": that name is taken by the "/" view below)
+faiss_index = to_gpu(load_or_build_index(documents, RAG_INDEX or ("Flat" if len(documents) < 1000 else "HNSW32,SQfp16")))
+_params = faiss.ParameterSpace()
+for name, value in (("efSearch", RAG_EF_SEARCH), ("nprobe", RAG_NPROBE)):
+    try:
+        _params.set_index_parameter(faiss_index, name, value)
+    except Exception:
+        pass  # knob doesn't apply to this index type
 
 # ðŸ” RAG query logic
 
 
+# Concurrent /ask requests are coalesced: the worker takes whatever arrives
+# within RAG_BATCH_WAIT of the first query and runs one encode + one search.
+_query_q: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+_query_worker = None
+_query_worker_lock = threading.Lock()
+
+
+def _query_loop():
+    while True:
+        batch = [_query_q.get()]
+        deadline = time.monotonic() + RAG_BATCH_WAIT
+        while len(batch) < RAG_BATCH:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                batch.append(_query_q.get(timeout=left))
+            except queue.Empty:
+                break
+        try:
+            vecs = embed([q for q, _ in batch], batch_size=RAG_BATCH)
+            D, I = faiss_index.search(vecs, k=1)
+            for (_, fut), best in zip(batch, I[:, 0]):
+                fut.set_result(int(best))
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+
+
+def _search_batched(query: str) -> int:
+    """Index of the best-matching document, via the batch worker."""
+    global _query_worker
+    if _query_worker is None:
+        with _query_worker_lock:
+            if _query_worker is None:
+                _query_worker = threading.Thread(target=_query_loop, name="rag-batch", daemon=True)
+                _query_worker.start()
+    fut = Future()
+    _query_q.put((query, fut))
+    return fut.result()
+
+
 def query_rag_system(query: str) -> dict:
     if query.lower() == "ping":
         return {"ok": True, "response": "pong"}
     try:
-        query_vec = model.encode([query])
-        D, I = index.search(np.array(query_vec), k=1)
-        best_match = documents[I[0][0]]
+        best_match = documents[_search_batched(query)]
         return {"ok": True, "response": best_match}
     except Exception as e:
         logger.error(f"RAG search error: {e}")
@@ -97,4 +202,11 @@ def print_banner():
 # ðŸ Run server
 if __name__ == "__main__":
     print_banner()
-    app.run(host="127.0.0.1", port=RAG_PORT, debug=False)
\ No newline at end of file
+    # waitress: multi-threaded production WSGI server (pip install waitress);
+    # also: gunicorn -k gthread --threads 8 rag_server:app -- threads, not
+    # forked workers, so they all share the one model/index and batch worker
+    try:
+        from waitress import serve
+        serve(app, host="127.0.0.1", port=RAG_PORT, threads=8)
+    except ImportError:
+        app.run(host="127.0.0.1", port=RAG_PORT, debug=False, threaded=True)
\ No newline at end of file
@@ -10,9 +10,9 @@ python .\rf_upload.py --src .\dataset\to_label --workspace <w> --project <p> --v
 from __future__ import annotations
 import argparse
 import os
-import shutil
-import tempfile
 import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List
 
@@ -21,21 +21,29 @@ from roboflow import Roboflow
 IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 
 
+def list_images(src: Path) -> List[Path]:
+    """Image files directly under src, in directory order."""
+    with os.scandir(src) as it:
+        return [Path(e.path) for e in it
+                if os.path.splitext(e.name)[1].lower() in IMAGE_EXTS and e.is_file()]
+
+
 def chunk_paths(paths: List[Path], size: int = 800):
     for i in range(0, len(paths), size):
         yield paths[i:i+size]
 
 
-def zip_chunk(files: List[Path], zip_dir: Path) -> Path:
-    tmp = tempfile.mkdtemp()
-    tmpd = Path(tmp)
-    imgdir = tmpd / "images"
-    imgdir.mkdir(parents=True, exist_ok=True)
-    for p in files:
-        shutil.copy2(p, imgdir / p.name)
-    zip_path = zip_dir / f"rf_upload_{int(time.time())}_{len(files)}.zip"
-    shutil.make_archive(str(zip_path).replace(".zip", ""), 'zip', str(tmpd))
-    shutil.rmtree(tmpd, ignore_errors=True)
+def zip_chunk(files: List[Path], zip_dir: Path, part: int = 0) -> Path:
+    """Zip files as images/<name> straight from their source paths.
+
+    Stored, not deflated: JPEG/PNG/WebP are already compressed, so deflate
+    would burn CPU for ~nothing.
+    """
+    # part keeps same-size chunks zipped in the same second from colliding
+    zip_path = zip_dir / f"rf_upload_{int(time.time())}_{part}_{len(files)}.zip"
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for p in files:
+            zf.write(p, arcname=f"images/{p.name}")
     return zip_path
 
 
@@ -52,6 +60,8 @@ def main():
                     default=os.getenv("ROBOFLOW_API_KEY"))
     ap.add_argument("--batch", type=int, default=800,
                     help="images per upload zip")
+    ap.add_argument("--workers", type=int, default=4,
+                    help="zips built/uploaded concurrently")
     args = ap.parse_args()
 
     if not args.api_key:
@@ -62,7 +72,7 @@ def main():
     if not src.exists():
         raise SystemExit(f"Source not found: {src}")
 
-    files = [p for p in src.glob("*") if p.suffix.lower() in IMAGE_EXTS]
+    files = list_images(src)
     if not files:
         print("[rf_upload] Nothing to upload in to_label.")
         return
@@ -74,13 +84,20 @@ def main():
     zip_dir = Path("pipeline_runs") / "roboflow_zips"
     zip_dir.mkdir(parents=True, exist_ok=True)
 
-    total = 0
-    for chunk in chunk_paths(files, size=args.batch):
-        z = zip_chunk(chunk, zip_dir)
+    def upload_one(part: int, chunk: List[Path]) -> int:
+        z = zip_chunk(chunk, zip_dir, part)
         print(f"[rf_upload] Uploading {len(chunk)} images via {z.name} ...")
         # Roboflow auto-detects unzip; this associates to the version for labeling
         version.upload(str(z))
-        total += len(chunk)
+        return len(chunk)
+
+    # uploads are network-bound, so overlap them (and the next zip's build)
+    total = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as ex:
+        futures = [ex.submit(upload_one, i, chunk)
+                   for i, chunk in enumerate(chunk_paths(files, size=args.batch))]
+        for f in as_completed(futures):
+            total += f.result()
 
     print(
         f"[rf_upload] Uploaded {total} images to {args.workspace}/{args.project}/{args.version}")
@@ -13,18 +13,20 @@ SCHEDULE_FILE = os.path.join(DATA_DIR, "schedule.json")
 LOG_FILE = os.path.join(LOGS_DIR, "watering.log")
 
 # ---------------- Valve driver (GPIO on Pi, mock on Windows) ----------------
+try:
+    import gpiozero  # type: ignore
+except Exception:
+    gpiozero = None
+
 class ValveDriver:
     def __init__(self, pin: int = 27) -> None:
         self.pin = pin
         self._active = False
         try:
-            try:
-                import gpiozero  # type: ignore
-                self._gpio = gpiozero.OutputDevice(pin, active_high=True, initial_value=False)
-                self._is_mock = False
-            except Exception:
-                self._gpio = None
-                self._is_mock = True
+            if gpiozero is None:
+                raise RuntimeError("gpiozero unavailable")
+            self._gpio = gpiozero.OutputDevice(pin, active_high=True, initial_value=False)
+            self._is_mock = False
         except Exception:
             self._gpio = None
             self._is_mock = True
@@ -43,12 +45,27 @@ class ValveDriver:
 
     def _log(self, tag: str, msg: str) -> None:
         ts = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        line = f"{ts} [{tag}] {msg}\n"
+        _append_log(f"{ts} [{tag}] {msg}\n")
+
+# Valve log: one line-buffered handle kept open for the process instead of
+# open/write/close per event (each line still reaches the file immediately)
+_log_fh = None
+_log_lock = threading.Lock()
+
+def _append_log(line: str) -> None:
+    global _log_fh
+    with _log_lock:  # the auto-off thread logs too
         try:
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                f.write(line)
+            if _log_fh is None:
+                _log_fh = open(LOG_FILE, "a", encoding="utf-8", buffering=1)
+            _log_fh.write(line)
         except Exception:
-            pass
+            try:
+                if _log_fh is not None:
+                    _log_fh.close()
+            except Exception:
+                pass
+            _log_fh = None  # reopen on the next event
 
 # ---------------- Schedule data ----------------
 @dataclass
@@ -58,24 +75,55 @@ class WaterJob:
     start: Optional[str] = None  # ISO time string
     created_at: str = dt.datetime.now().isoformat(timespec="seconds")
 
+# ((mtime_ns, size), items) of the last schedule.json read or written
+_schedule_cache: tuple = (None, [])
+
+def _stat_key(path: str):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
 def load_schedule() -> List[Dict[str, Any]]:
-    if not os.path.exists(SCHEDULE_FILE):
+    """Items in schedule.json; only re-parsed when the file changes.
+
+    Returns a new list each call, so callers may append to it freely.
+    """
+    global _schedule_cache
+    try:
+        key = _stat_key(SCHEDULE_FILE)
+    except OSError:
         return []
+    if _schedule_cache[0] == key:
+        return list(_schedule_cache[1])
+    data = []
     try:
         with open(SCHEDULE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            return data
+            parsed = json.load(f)
+        if isinstance(parsed, list):
+            data = parsed
     except Exception:
         pass
-    return []
+    _schedule_cache = (key, data)
+    return list(data)
+
+def _atomic_write_json(path: str, obj: Any) -> None:
+    """Serialize in memory, write it in one go, fsync, then rename over path.
+
+    Readers see either the old file or the new one, never a half-written one.
+    """
+    data = json.dumps(obj, indent=2).encode("utf-8")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb", buffering=0) as f:
+        f.write(data)
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 def save_schedule(items: List[Dict[str, Any]]) -> None:
+    global _schedule_cache
     try:
-        with open(SCHEDULE_FILE, "w", encoding="utf-8") as f:
-            json.dump(items, f, indent=2)
+        _atomic_write_json(SCHEDULE_FILE, items)
+        _schedule_cache = (_stat_key(SCHEDULE_FILE), list(items))  # no re-read next load
     except Exception:
-        pass
+        _schedule_cache = (None, [])
 
 def _coerce_float(v: Any, default: float = 0.0) -> float:
     try:
@@ -83,6 +131,58 @@ def _coerce_float(v: Any, default: float = 0.0) -> float:
     except Exception:
         return default
 
+# One driver per pin for the life of the process: re-creating gpiozero's
+# OutputDevice per message is slow, and a second one on a claimed pin fails.
+_DRIVERS: Dict[int, ValveDriver] = {}
+_drivers_lock = threading.Lock()
+
+def _get_driver(pin: int) -> ValveDriver:
+    d = _DRIVERS.get(pin)
+    if d is None:
+        with _drivers_lock:
+            d = _DRIVERS.get(pin)
+            if d is None:
+                d = _DRIVERS[pin] = ValveDriver(pin)
+    return d
+
+# Auto-off timers: one thread sleeps until the earliest deadline instead of a
+# sleeping thread per start. Keyed by pin, so a new start or a stop replaces
+# or cancels that valve's pending off.
+_off_deadlines: Dict[int, tuple] = {}  # pin -> (time.monotonic() deadline, driver)
+_off_cv = threading.Condition()
+_off_thread: Optional[threading.Thread] = None
+
+def _auto_off_loop() -> None:
+    while True:
+        with _off_cv:
+            while True:
+                now = time.monotonic()
+                due = [pin for pin, (t, _) in _off_deadlines.items() if t <= now]
+                if due:
+                    break
+                nxt = min((t for t, _ in _off_deadlines.values()), default=None)
+                _off_cv.wait(None if nxt is None else nxt - now)
+            valves = [_off_deadlines.pop(pin)[1] for pin in due]
+        for valve in valves:
+            try:
+                valve.off()
+            except Exception:
+                pass
+
+def _schedule_off(valve: ValveDriver, secs: float) -> None:
+    global _off_thread
+    with _off_cv:
+        _off_deadlines[valve.pin] = (time.monotonic() + secs, valve)
+        if _off_thread is None:
+            _off_thread = threading.Thread(target=_auto_off_loop, name="valve-auto-off", daemon=True)
+            _off_thread.start()
+        _off_cv.notify()
+
+def _cancel_off(valve: ValveDriver) -> None:
+    with _off_cv:
+        if _off_deadlines.pop(valve.pin, None) is not None:
+            _off_cv.notify()
+
 # ---------------- Public entry used by app.py ----------------
 def handle_hydration_message(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -97,22 +197,20 @@ def handle_hydration_message(payload: Dict[str, Any]) -> Dict[str, Any]:
     minutes = _coerce_float(payload.get("minutes", 0))
 
     # Lightweight single-valve control (extend as needed per zone->pin map)
-    valve = ValveDriver(pin=27)
+    valve = _get_driver(27)
 
     if action in ("start", "run", "on"):
         valve.on()
-        # Run in the background to turn off after N minutes (if minutes>0)
+        # Turn off in the background after N minutes (if minutes>0); this
+        # replaces any auto-off still pending from an earlier start
         if minutes > 0:
-            def _auto_off(secs: float):
-                time.sleep(secs)
-                try:
-                    valve.off()
-                except Exception:
-                    pass
-            threading.Thread(target=_auto_off, args=(minutes*60,), daemon=True).start()
+            _schedule_off(valve, minutes * 60)
+        else:
+            _cancel_off(valve)
         return {"ok": True, "action": "start", "zone": zone, "minutes": minutes}
 
     if action in ("stop", "off", "cancel"):
+        _cancel_off(valve)
         valve.off()
         return {"ok": True, "action": "stop", "zone": zone}
 
@@ -151,7 +249,7 @@ class ScheduleStore:
             self.save()
 
     def save(self):
-        self.path.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+        _atomic_write_json(str(self.path), self.data)
 
     def set_zone(self, zone: int, cfg: dict):
         d = self.data.setdefault("zones", {})
@@ -1,6 +1,7 @@
 # File: scripts/springfield_adapter.py
-import time, json, requests, os
+import time, json, requests, os, functools
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 import cv2
 import numpy as np
 
@@ -16,6 +17,10 @@ CLASS_NAMES = ["grass", "dead_grass", "puddle", "standing_water"]  # replace wit
 POST_URL = os.environ.get("II_POST_URL", "http://127.0.0.1:5051/api/hydration")
 CAMERA_SRC = int(os.environ.get("II_CAMERA_SRC", "0"))  # or path to video
 
+# keep-alive session: the 1 Hz post loop reuses one socket instead of reconnecting
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
 def make_payload(green_coverage, detections, extra=None):
     return {
         "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -26,23 +31,45 @@ def make_payload(green_coverage, detections, extra=None):
         "detections": detections
     }
 
+_HSV_LOWER = np.array([35, 40, 40], dtype=np.uint8)
+_HSV_UPPER = np.array([85, 255, 255], dtype=np.uint8)
+_BUFS = {}  # (name, shape) -> scratch image reused frame to frame (camera size is fixed)
+
+def _buf(name, shape):
+    b = _BUFS.get((name, shape))
+    if b is None:
+        b = _BUFS[(name, shape)] = np.empty(shape, np.uint8)
+    return b
+
 def compute_green_ratio(frame_bgr):
-    hsv = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2HSV)
-    lower = np.array([35, 40, 40], dtype=np.uint8)
-    upper = np.array([85, 255, 255], dtype=np.uint8)
-    mask = cv2.inRange(hsv, lower, upper)
-    return float(np.count_nonzero(mask)) / mask.size
+    # a ratio doesn't need every pixel: half-size (INTER_AREA) is 4x less HSV work
+    h, w = frame_bgr.shape[:2]
+    sh, sw = max(1, h // 2), max(1, w // 2)
+    small = cv2.resize(frame_bgr, (sw, sh), dst=_buf("small", (sh, sw, 3)), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV, dst=_buf("hsv", (sh, sw, 3)))
+    mask = cv2.inRange(hsv, _HSV_LOWER, _HSV_UPPER, dst=_buf("mask", (sh, sw)))
+    return cv2.countNonZero(mask) / float(mask.size)
+
+@functools.lru_cache(maxsize=1)
+def get_model():
+    """Load the weights once; every frame after the first only runs inference."""
+    return YOLO(MODEL_PATH)
 
 def detect_with_ultralytics(frame):
-    model = YOLO(MODEL_PATH)
-    # run one-shot detection; tune params to your model
-    results = model.predict(source=frame, imgsz=640, conf=0.35, half=False, device='cpu')
+    model = get_model()
+    # run one-shot detection; tune params to your model (half only helps on GPU)
+    results = model.predict(source=frame, imgsz=640, conf=0.35, half=False, device='cpu', verbose=False)
     # assuming results[0] exists
     r = results[0]
     detections = []
-    for box, cls, conf in zip(r.boxes.xyxy.tolist() if hasattr(r, 'boxes') else [], r.boxes.cls.tolist() if hasattr(r, 'boxes') else [], r.boxes.conf.tolist() if hasattr(r, 'boxes') else []):
-        cls = int(cls)
-        detections.append({"class": CLASS_NAMES[cls] if cls < len(CLASS_NAMES) else str(cls), "conf": float(conf), "bbox": box})
+    boxes = getattr(r, 'boxes', None)
+    if boxes is None:
+        return detections
+    # boxes.data rows are [x1, y1, x2, y2, (track id,) conf, cls]: one device->host
+    # copy and one list, instead of one per xyxy / cls / conf tensor
+    for row in boxes.data.tolist():
+        cls = int(row[-1])
+        detections.append({"class": CLASS_NAMES[cls] if cls < len(CLASS_NAMES) else str(cls), "conf": float(row[-2]), "bbox": row[:4]})
     return detections
 
 def main_loop():
@@ -66,7 +93,7 @@ def main_loop():
                 print("model inference error:", e)
         payload = make_payload(green, detections)
         try:
-            r = requests.post(POST_URL, json=payload, timeout=3.0)
+            r = SESSION.post(POST_URL, json=payload, timeout=3.0)
             print("POST", r.status_code, r.text)
         except Exception as e:
             print("POST failed:", e)
@@ -3,19 +3,14 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from pathlib import Path
 import time
-import json
-import chromadb
-from sentence_transformers import SentenceTransformer
+from embeddings import embed, get_kb_collection, jsonl_line
 
 DATA_DIR = Path("data/knowledge")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 KB_PATH = DATA_DIR / "knowledge.jsonl"
 
-# Embeddings + Chroma (persistent)
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-chroma = chromadb.PersistentClient(path=str(DATA_DIR / "chroma"))
-collection = chroma.get_or_create_collection(
-    name="ii_kb", metadata={"hnsw:space": "cosine"})
+# Embeddings (shared embeddings.py, same model as Chroma's default) + Chroma (persistent)
+collection = get_kb_collection()
 
 app = Flask(__name__)
 CORS(app)  # allow requests from http://127.0.0.1:8080, 5050, etc.
@@ -24,11 +19,12 @@ CORS(app)  # allow requests from http://127.0.0.1:8080, 5050, etc.
 def store(text: str, typ: str = "fact"):
     entry = {"timestamp": time.time(), "type": typ, "text": text}
     KB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with KB_PATH.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    with KB_PATH.open("ab") as f:
+        f.write(jsonl_line(entry))
 
     doc_id = f"{entry['timestamp']}_{typ}"
     collection.upsert(ids=[doc_id], documents=[text],
+                      embeddings=embed([text]).tolist(),
                       metadatas=[{"type": typ}])
 
 
@@ -63,4 +59,10 @@ def home():
 
 
 if __name__ == "__main__":
-    app.run(port=5054, debug=True)
\ No newline at end of file
+    # waitress: multi-threaded production WSGI server (pip install waitress);
+    # also: gunicorn -k gthread --threads 8 teach_api:app
+    try:
+        from waitress import serve
+        serve(app, host="127.0.0.1", port=5054, threads=8)
+    except ImportError:
+        app.run(port=5054, threaded=True)
\ No newline at end of file
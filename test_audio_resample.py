@@ -0,0 +1,51 @@
+# test_audio_resample.py
+# Block-wise StreamResampler output must match resample_poly over the whole stream.
+# Run with pytest, or directly: python test_audio_resample.py
+import numpy as np
+from scipy.signal import resample_poly
+
+from audio_resample import StreamResampler
+
+
+def _stream(rate: int, seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * seconds)) / rate
+    x = 8000 * np.sin(2 * np.pi * 440 * t) + 3000 * np.sin(2 * np.pi * 3100 * t)
+    return np.clip(x + rng.normal(0, 500, t.size), -32768, 32767).astype(np.int16)
+
+
+def check_blockwise_matches_whole(device_rate: int, block: int = 1024) -> None:
+    x = _stream(device_rate, 3.0)
+    rs = StreamResampler(16000, device_rate)
+    got = np.concatenate([rs.process(x[i:i + block].astype(np.float64))
+                          for i in range(0, x.size, block)])
+    want = resample_poly(x.astype(np.float64), rs.up, rs.down)
+    # everything emitted so far is final; only the last ~half filter is still pending
+    assert want.size - got.size <= rs.half_len // rs.down + 1
+    err = np.abs(got - want[:got.size])
+    assert err.max() < 1e-6, err.max()
+    # no drift: output count tracks input * up / down
+    assert abs(got.size - x.size * rs.up / rs.down) <= rs.half_len // rs.down + 1
+
+
+def test_blockwise_matches_whole_44100():
+    check_blockwise_matches_whole(44100)
+
+
+def test_blockwise_matches_whole_22050_odd_blocks():
+    check_blockwise_matches_whole(22050, block=997)
+
+
+def test_reset_restarts_stream():
+    x = _stream(44100, 0.5).astype(np.float64)
+    rs = StreamResampler(16000, 44100)
+    first = rs.process(x)
+    rs.reset()
+    np.testing.assert_array_equal(rs.process(x), first)
+
+
+if __name__ == "__main__":
+    test_blockwise_matches_whole_44100()
+    test_blockwise_matches_whole_22050_odd_blocks()
+    test_reset_restarts_stream()
+    print("ok")
@@ -3,12 +3,13 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from pathlib import Path
 import time
-import json
 import requests
+from requests.adapters import HTTPAdapter
 import csv
+import atexit
+import threading
 
-import chromadb
-from sentence_transformers import SentenceTransformer
+from embeddings import ChromaBatcher, get_kb_collection, jsonl_line
 
 DATA_DIR = Path("data/knowledge")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -18,29 +19,67 @@ PAIR_DIR.mkdir(parents=True, exist_ok=True)
 PAIR_FILE = PAIR_DIR / "pairs.csv"
 
 CAMERA_BASE = "http://127.0.0.1:5051"
+# keep-alive connections to the camera server, shared by request threads
+camera_session = requests.Session()
+camera_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
 
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-chroma = chromadb.PersistentClient(path=str(DATA_DIR / "chroma"))
-collection = chroma.get_or_create_collection(
-    name="ii_kb", metadata={"hnsw:space": "cosine"})
+# facts are embedded in batches (embeddings.py) rather than one forward pass per upsert;
+# the collection is only opened on the first flush
+kb_writer = ChromaBatcher(get_kb_collection)
 
 app = Flask(__name__)
 CORS(app)
 
+# knowledge.jsonl and pairs.csv stay open for the process instead of being
+# reopened per request; every row is flushed before the request returns
+_kb_fh = None
+_pair_fh = None
+_pair_writer = None
+_io_lock = threading.Lock()
+
+
+def _close_files():
+    for fh in (_kb_fh, _pair_fh):
+        if fh is not None:
+            fh.close()
+
+
+atexit.register(_close_files)
+
+
+def append_kb(entry: dict):
+    global _kb_fh
+    with _io_lock:
+        if _kb_fh is None:
+            _kb_fh = KB_PATH.open("ab", buffering=1 << 16)
+        _kb_fh.write(jsonl_line(entry))
+        _kb_fh.flush()
+
+
+def append_pair(row: list):
+    """Append a CSV row safely (handles quotes/commas/newlines); header on a new file."""
+    global _pair_fh, _pair_writer
+    with _io_lock:
+        if _pair_fh is None:
+            _pair_fh = PAIR_FILE.open("a", encoding="utf-8", newline="", buffering=1 << 16)
+            _pair_writer = csv.writer(_pair_fh)
+            if _pair_fh.tell() == 0:
+                _pair_writer.writerow(["timestamp", "type", "text", "label", "snapshot_path"])
+        _pair_writer.writerow(row)
+        _pair_fh.flush()
+
 
 def store_text(text: str, typ: str = "fact"):
     entry = {"timestamp": time.time(), "type": typ, "text": text}
-    with KB_PATH.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    append_kb(entry)
     doc_id = f"{entry['timestamp']}_{typ}"
-    collection.upsert(ids=[doc_id], documents=[text],
-                      metadatas=[{"type": typ}])
+    kb_writer.add(doc_id, text, {"type": typ})
     return entry
 
 
 def take_snapshot(label: str):
-    r = requests.get(f"{CAMERA_BASE}/snapshot",
-                     params={"label": label}, timeout=8)
+    r = camera_session.get(f"{CAMERA_BASE}/snapshot",
+                           params={"label": label}, timeout=8)
     r.raise_for_status()
     j = r.json()
     if not j.get("ok"):
@@ -65,13 +104,8 @@ def pair():
     except Exception as e:
         return jsonify({"ok": False, "error": f"snapshot: {e}"}), 500
 
-    # 3) append a CSV row safely (handles quotes/commas/newlines)
-    new_file = not PAIR_FILE.exists()
-    with PAIR_FILE.open("a", encoding="utf-8", newline="") as f:
-        w = csv.writer(f)
-        if new_file:
-            w.writerow(["timestamp", "type", "text", "label", "snapshot_path"])
-        w.writerow([entry["timestamp"], "fact", text, label, path])
+    # 3) append a CSV row
+    append_pair([entry["timestamp"], "fact", text, label, path])
 
     return jsonify({"ok": True, "snapshot_path": path})
 
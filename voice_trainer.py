@@ -4,20 +4,18 @@
 
 import os
 import re
-import json
 import time
+import atexit
+import functools
 import threading
 import queue
 import sys
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import numpy as np
 import sounddevice as sd
-from faster_whisper import WhisperModel
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-import pyttsx3
+from embeddings import ChromaBatcher, get_kb_collection, jsonl_line
 from pynput import keyboard
 
 # ================== Config ==================
@@ -27,12 +25,25 @@ KB_PATH = DATA_DIR / "knowledge.jsonl"
 
 # camera_server.py base URL
 CAMERA_BASE = os.getenv("II_CAMERA_BASE", "http://127.0.0.1:5051")
+camera_session = requests.Session()  # one keep-alive connection for every voice command
+camera_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
 # "base" | "small" | "medium" | etc.
 WHISPER_MODEL = os.getenv("II_WHISPER", "base")
+# "auto" = CUDA when CTranslate2 sees a GPU, else CPU
+WHISPER_DEVICE = os.getenv("II_WHISPER_DEVICE", "auto")
+# "" = int8_float16 on CUDA (int8 weights, fp16 math), int8 on CPU
+WHISPER_COMPUTE = os.getenv("II_WHISPER_CT", "")
 SAMPLE_RATE = 16000
 CHANNELS = 1
 MAX_TALK_SECONDS = 30         # hard cap per utterance
 SILENCE_TAIL_SECONDS = 0.6    # trim trailing silence when releasing Space
+STREAM_STEP_SECONDS = 1.0     # re-transcribe the unconfirmed audio this often while Space is held
+# Silero VAD (bundled with faster-whisper) cuts silence out before decoding
+WHISPER_VAD = os.getenv("II_WHISPER_VAD", "1") != "0"
+VAD_PARAMS = {"min_silence_duration_ms": 500, "speech_pad_ms": 200}
+# greedy decoding (faster-whisper defaults to beam 5 plus temperature-fallback
+# re-decodes); LocalAgreement already filters unstable words across passes
+WHISPER_BEAM = int(os.getenv("II_WHISPER_BEAM", "1"))
 # ============================================
 
 # ---------- Audio setup (device picker) ----------
@@ -79,61 +90,132 @@ print("ðŸŽ¤ Using input device:", INPUT_DEVICE,
       sd.query_devices()[INPUT_DEVICE]["name"])
 
 # ---------- STT, embeddings, DB, TTS ----------
-print("ðŸ”¡ Loading Whisper model:", WHISPER_MODEL)
-# uses CPU by default; set env for GPU if you want
-asr = WhisperModel(WHISPER_MODEL)
+def whisper_device() -> str:
+    if WHISPER_DEVICE != "auto":
+        return WHISPER_DEVICE
+    try:
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except Exception:
+        return "cpu"
 
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-chroma_client = chromadb.PersistentClient(path=str(DATA_DIR / "chroma"))
-collection = chroma_client.get_or_create_collection(
-    name="ii_kb", metadata={"hnsw:space": "cosine"})
 
-tts = pyttsx3.init()
+_asr_device = whisper_device()
+_asr_compute = WHISPER_COMPUTE or ("int8_float16" if _asr_device == "cuda" else "int8")
+_asr_lock = threading.Lock()
 
 
-def speak(text: str):
+@functools.lru_cache(maxsize=1)
+def _load_asr():
+    from faster_whisper import WhisperModel
+    print("ðŸ”¡ Loading Whisper model:", WHISPER_MODEL, f"({_asr_device}, {_asr_compute})")
+    model = WhisperModel(WHISPER_MODEL, device=_asr_device, compute_type=_asr_compute)
+    # one dummy pass so the first real utterance doesn't pay for kernel setup
+    # (transcribe is lazy; the segments generator has to be consumed)
+    list(model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), language="en")[0])
+    return model
+
+
+def get_asr():
+    """Process-wide Whisper model, loaded on first use (main() starts that in the background)."""
+    with _asr_lock:
+        return _load_asr()
+
+
+# utterances are embedded in batches (embeddings.py) rather than one forward pass per upsert
+kb_writer = ChromaBatcher(get_kb_collection)
+
+
+# Speech runs on its own thread so runAndWait() never holds up the next
+# recording; phrases are spoken in order.
+_tts_q: "queue.Queue[str]" = queue.Queue()
+_tts_worker = None
+_tts_worker_lock = threading.Lock()
+
+
+def _tts_loop():
     try:
-        tts.say(text)
-        tts.runAndWait()
+        import pyttsx3
+        tts = pyttsx3.init()  # created here: SAPI/COM engines belong to their thread
     except Exception:
-        pass
+        tts = None
+    while True:
+        text = _tts_q.get()
+        if tts is None:
+            continue
+        try:
+            tts.say(text)
+            tts.runAndWait()
+        except Exception:
+            pass
+
+
+def speak(text: str):
+    """Queue text to be spoken; returns immediately."""
+    global _tts_worker
+    if _tts_worker is None:
+        with _tts_worker_lock:
+            if _tts_worker is None:
+                _tts_worker = threading.Thread(target=_tts_loop, name="tts", daemon=True)
+                _tts_worker.start()
+    _tts_q.put(text)
 
 # ---------- Knowledge helpers ----------
 
 
+# One anchored scan picks the intent from the utterance's opening words:
+# camera commands (dataset labeling while you talk), questions, answers.
+_INTENT_RE = re.compile(
+    r"(?P<command>(?P<action>snapshot|label)\s+(?P<label>[a-z0-9_\-]+))"
+    r"|(?P<question>what|why|how|when|where|who)"
+    r"|(?P<answer>answer:|ans:|the answer is)")
+
+
 def intent_of(text: str):
     lower = text.lower().strip()
+    m = _INTENT_RE.match(lower)
+    kind = m.lastgroup if m else None
 
-    # Camera commands (dataset labeling while you talk)
-    m = re.match(r"(snapshot|label)\s+([a-zA-Z0-9_\-]+)", lower)
-    if m:
-        return ("command", {"action": m.group(1), "label": m.group(2)})
-
-    if lower.endswith("?") or lower.startswith(("what", "why", "how", "when", "where", "who")):
+    if kind == "command":
+        return ("command", {"action": m.group("action"), "label": m.group("label")})
+    if kind == "question" or lower.endswith("?"):
         return ("question", {})
-    if lower.startswith(("answer:", "ans:", "the answer is")):
+    if kind == "answer":
         return ("answer", {})
-    if lower.startswith(("fact:", "note:", "remember that", "stat:", "statement:")) or "remember that" in lower:
-        return ("fact", {})
-    if re.search(r"\d", lower):  # numbers often indicate stats
-        return ("fact", {})
-    return ("fact", {})  # default to storing declarative knowledge
+    # "fact:", "note:", "remember that", numbers, ... all store declarative knowledge
+    return ("fact", {})
+
+
+# knowledge.jsonl stays open (binary append) instead of being reopened per utterance
+_kb_fh = None
+_kb_lock = threading.Lock()
+
+
+def _close_kb():
+    if _kb_fh is not None:
+        _kb_fh.close()
+
+
+atexit.register(_close_kb)
 
 
 def store_knowledge(entry):
-    KB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with KB_PATH.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    global _kb_fh
+    with _kb_lock:
+        if _kb_fh is None:
+            KB_PATH.parent.mkdir(parents=True, exist_ok=True)
+            _kb_fh = KB_PATH.open("ab", buffering=1 << 16)
+        _kb_fh.write(jsonl_line(entry))
+        _kb_fh.flush()
     doc_id = f"{entry['timestamp']}_{entry['type']}_{hash(entry['text'])%10**8}"
-    collection.upsert(ids=[doc_id], documents=[
-                      entry["text"]], metadatas=[{"type": entry["type"]}])
+    kb_writer.add(doc_id, entry["text"], {"type": entry["type"]})
 
 
 def do_camera_command(cmd):
     try:
         label = cmd["label"]
-        r = requests.get(f"{CAMERA_BASE}/snapshot",
-                         params={"label": label}, timeout=5)
+        r = camera_session.get(f"{CAMERA_BASE}/snapshot",
+                               params={"label": label}, timeout=5)
         if r.ok:
             print("ðŸ“¸ Snapshot saved:", r.json().get("path"))
             speak(f"Saved {label} snapshot.")
@@ -145,24 +227,96 @@ def do_camera_command(cmd):
         speak("Could not reach camera.")
 
 
+# ---------- Streaming transcription (LocalAgreement-2) ----------
+
+
+class StreamingTranscriber:
+    """Whisper-Streaming's LocalAgreement-2 policy.
+
+    The audio after the last confirmed word is re-transcribed each step; the
+    words two consecutive hypotheses agree on are committed and their audio
+    dropped, so on release only the short unconfirmed tail is left to decode.
+    """
+
+    def __init__(self):
+        self.committed = []  # final words
+        self.pending = []    # previous hypothesis past the commit point
+        self.offset = 0      # samples already committed (dropped from the front)
+
+    def _hypothesis(self, audio: np.ndarray):
+        prompt = " ".join(self.committed[-50:]) or None
+        # audio is already a float32 view into the capture buffer; this only
+        # guards against a copy inside transcribe if that ever changes
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        # with vad_filter, word timestamps are mapped back onto the unfiltered audio
+        segments, _ = get_asr().transcribe(audio, language="en", initial_prompt=prompt,
+                                           beam_size=WHISPER_BEAM, temperature=0.0,
+                                           condition_on_previous_text=False, word_timestamps=True,
+                                           vad_filter=WHISPER_VAD, vad_parameters=VAD_PARAMS)
+        return [(w.end, w.word.strip()) for s in segments for w in (s.words or []) if w.word.strip()]
+
+    def update(self, audio: np.ndarray):
+        """audio: samples from self.offset up to now."""
+        hyp = self._hypothesis(audio)
+        n = 0
+        while (n < len(hyp) and n < len(self.pending)
+               and hyp[n][1].lower() == self.pending[n].lower()):
+            n += 1
+        if n:
+            self.committed += [w for _, w in hyp[:n]]
+            self.offset += min(int(hyp[n - 1][0] * SAMPLE_RATE), len(audio))
+        self.pending = [w for _, w in hyp[n:]]
+
+    def finish(self, audio: np.ndarray) -> str:
+        """Decode the unconfirmed tail once more and return the whole utterance."""
+        tail = [w for _, w in self._hypothesis(audio)] if len(audio) else []
+        return " ".join(self.committed + tail).strip()
+
+
+def _stream_loop(st: StreamingTranscriber, stop: threading.Event):
+    while not stop.wait(STREAM_STEP_SECONDS):
+        audio = recorded_audio()[st.offset:int(MAX_TALK_SECONDS * SAMPLE_RATE)]
+        if len(audio) >= int(STREAM_STEP_SECONDS * SAMPLE_RATE):
+            try:
+                st.update(audio)
+            except Exception as e:
+                print("Streaming transcribe error:", e)
+
+
 # ---------- Recording: push-to-talk with Space ----------
 recording = threading.Event()
-audio_buf = []
+# one preallocated MAX_TALK_SECONDS buffer per utterance; the callback copies
+# each block in at the cursor (audio past the cap is dropped, as it was before)
+audio_buf = np.empty(0, dtype=np.float32)
+audio_pos = 0
 stream = None
 buf_lock = threading.Lock()
+_streamer = None
+_stream_stop = threading.Event()
+_stream_thread = None
+
+
+def recorded_audio() -> np.ndarray:
+    """Mono float32 samples captured since Space was pressed."""
+    with buf_lock:
+        return audio_buf[:audio_pos]  # view; the callback only writes past audio_pos
 
 
 def audio_callback(indata, frames, time_info, status):
     if status:
         print("Audio status:", status)
+    global audio_pos
     with buf_lock:
-        audio_buf.append(indata.copy())
+        n = min(frames, len(audio_buf) - audio_pos)
+        audio_buf[audio_pos:audio_pos + n] = indata[:n, 0]
+        audio_pos += n
 
 
 def start_recording():
-    global stream, audio_buf
+    global stream, audio_buf, audio_pos, _streamer, _stream_thread
     with buf_lock:
-        audio_buf = []
+        audio_buf = np.empty(int(MAX_TALK_SECONDS * SAMPLE_RATE), dtype=np.float32)
+        audio_pos = 0
     # Use ~200ms blocks
     blocksize = int(0.2 * SAMPLE_RATE)  # 3200 at 16kHz
     stream = sd.InputStream(samplerate=SAMPLE_RATE,
@@ -173,6 +327,11 @@ def start_recording():
                             device=INPUT_DEVICE)
     stream.start()
     recording.set()
+    _streamer = StreamingTranscriber()
+    _stream_stop.clear()
+    _stream_thread = threading.Thread(target=_stream_loop, args=(_streamer, _stream_stop),
+                                      name="whisper-stream", daemon=True)
+    _stream_thread.start()
     print("ðŸŽ™ï¸ Recordingâ€¦ (hold Space)")
 
 
@@ -185,13 +344,15 @@ def stop_recording_and_process():
         except Exception:
             pass
     recording.clear()
+    _stream_stop.set()
+    if _stream_thread:
+        _stream_thread.join()  # at most one in-flight step; asr is not shared concurrently
 
     # Gather audio
-    with buf_lock:
-        if not audio_buf:
-            print("â€¦no audio captured.")
-            return
-        data = np.concatenate(audio_buf, axis=0)[:, 0]  # mono float32
+    data = recorded_audio()
+    if not len(data):
+        print("â€¦no audio captured.")
+        return
 
     # Trim tail silence (simple fixed tail)
     tail = int(SILENCE_TAIL_SECONDS * SAMPLE_RATE)
@@ -202,10 +363,9 @@ def stop_recording_and_process():
     max_len = int(MAX_TALK_SECONDS * SAMPLE_RATE)
     data = data[:max_len]
 
-    # Transcribe
+    # Transcribe what the streaming pass hasn't confirmed yet
     print("ðŸ§  Transcribingâ€¦")
-    segments, _ = asr.transcribe(data, language="en")
-    text = " ".join(s.text.strip() for s in segments if s.text).strip()
+    text = _streamer.finish(data[_streamer.offset:])
     if not text:
         print("â€¦nothing recognized.")
         speak("I didn't catch that.")
@@ -242,6 +402,8 @@ def on_release(key):
 
 
 def main():
+    # Whisper loads while the user gets ready; the first utterance waits only if it isn't done
+    threading.Thread(target=get_asr, name="whisper-load", daemon=True).start()
     print("ðŸŸ¢ Push-to-talk ready. Hold SPACE to speak; release to save.")
     print("   Commands: say â€œsnapshot leakâ€ or â€œlabel oversaturatedâ€.")
     with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
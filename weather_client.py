@@ -7,10 +7,26 @@ from typing import Dict, Any
 DATA = Path(__file__).parent / 'data'
 CACHE = DATA / 'weather_cache.json'
 
+# ((mtime_ns, size), parsed) of the last weather_cache.json read
+_cached: tuple = (None, None)
+
+def _stub() -> Dict[str, Any]:
+    return { 'source':'stub', 'temp_f':78.0, 'humidity':0.55, 'rain_in_last_24h':0.0 }
+
 def get_weather() -> Dict[str, Any]:
-    if CACHE.exists():
+    """Cached weather, re-parsed only when the file changes (a copy each call)."""
+    global _cached
+    try:
+        st = CACHE.stat()
+    except OSError:
+        return _stub()
+    key = (st.st_mtime_ns, st.st_size)
+    if _cached[0] != key:
         try:
-            return json.loads(CACHE.read_text(encoding='utf-8'))
+            data = json.loads(CACHE.read_text(encoding='utf-8'))
+            if not isinstance(data, dict):
+                data = None
         except Exception:
-            pass
-    return { 'source':'stub', 'temp_f':78.0, 'humidity':0.55, 'rain_in_last_24h':0.0 }
\ No newline at end of file
+            data = None  # unreadable: stub until the file changes
+        _cached = (key, data)
+    return dict(_cached[1]) if _cached[1] is not None else _stub()
\ No newline at end of file
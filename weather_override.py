@@ -31,9 +31,11 @@ Return value example:
 Defaults are tuned for a Texas-style schedule (deep & infrequent) but are configurable.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime, timedelta
 
+import numpy as np
+
 
 # sensible default config — tweak to taste
 DEFAULT_CONFIG = {
@@ -53,6 +55,60 @@ DEFAULT_CONFIG = {
 }
 
 
+def _verdict(precip_24, pop, soil, temp_f, wind, cfg):
+    """(action, duration_factor, reason) of the first rule that applies."""
+    # 1) Skip if there was significant rain recently
+    if precip_24 >= cfg["min_precip_skip_mm"]:
+        return ("skip", 0.0,
+                f"Recent rainfall {precip_24:.1f} mm >= {cfg['min_precip_skip_mm']} mm — skipping watering.")
+
+    # 2) Skip if soil moisture sensor indicates already wet
+    if soil is not None:
+        try:
+            if soil >= cfg["soil_moisture_high_pct"]:
+                return ("skip", 0.0,
+                        f"Soil moisture {soil:.0f}% >= {cfg['soil_moisture_high_pct']}% — skipping watering.")
+        except Exception:
+            pass
+
+    # 3) Skip if high probability of rain in next window
+    if pop >= cfg["pop_skip_threshold"]:
+        return ("skip", 0.0,
+                f"Chance of precipitation {pop}% >= {cfg['pop_skip_threshold']}% — skipping scheduled run.")
+
+    # 4) Reduce if wind is too high (to avoid evaporative loss and uneven coverage)
+    if wind >= cfg["wind_cutoff_kph"]:
+        return ("reduce", max(cfg["max_reduce_factor"], 0.3),
+                f"High wind {wind} kph >= {cfg['wind_cutoff_kph']} kph — reducing duration to limit waste.")
+
+    # 5) Temperature-driven adjustments (hot weather -> increase)
+    if temp_f is not None:
+        if temp_f >= cfg["very_hot_temp_f"]:
+            return ("increase", cfg["max_increase_factor"],
+                    f"Very hot {temp_f}°F >= {cfg['very_hot_temp_f']}°F — increasing duration.")
+        if temp_f >= cfg["hot_temp_f"]:
+            # small bump for hot but not extreme
+            return ("increase", min(1.25, cfg["max_increase_factor"]),
+                    f"Hot {temp_f}°F >= {cfg['hot_temp_f']}°F — moderate increase to avoid heat stress.")
+
+    # 6) If soil is very dry, consider slight increase
+    if soil is not None:
+        try:
+            if soil <= cfg["soil_moisture_low_pct"]:
+                return ("increase", min(1.25, cfg["max_increase_factor"]),
+                        f"Soil moisture low ({soil:.0f}%) <= {cfg['soil_moisture_low_pct']}% — increasing duration.")
+        except Exception:
+            pass
+
+    # 7) If light precipitation occurred but not enough to skip, reduce
+    if 0 < precip_24 < cfg["min_precip_skip_mm"]:
+        return ("reduce", max(0.6, 1.0 - (precip_24 / (cfg["min_precip_skip_mm"] * 2))),
+                f"Light recent precipitation ({precip_24:.1f} mm) — reducing duration proportionally.")
+
+    # default: normal
+    return ("normal", 1.0, "Conditions normal.")
+
+
 def decide_override(snapshot: Dict[str, Any], config: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Decide whether to skip/reduce/normal/increase watering given a weather snapshot.
@@ -61,9 +117,8 @@ def decide_override(snapshot: Dict[str, Any], config: Dict[str, Any] = None) ->
     snapshot: weather and optional soil data (see top docstring)
     config: override default thresholds
     """
-    cfg = dict(DEFAULT_CONFIG)
-    if config:
-        cfg.update(config)
+    # DEFAULT_CONFIG is only read, so it needs no copy when nothing is overridden
+    cfg = {**DEFAULT_CONFIG, **config} if config else DEFAULT_CONFIG
 
     # normalize input
     precip_24 = snapshot.get("precip_mm_24h") or snapshot.get("precip_today_mm") or 0.0
@@ -72,10 +127,18 @@ def decide_override(snapshot: Dict[str, Any], config: Dict[str, Any] = None) ->
     temp_f = snapshot.get("temp_f")
     wind = snapshot.get("wind_kph", 0.0)
 
-    decision = {
-        "action": "normal",
-        "duration_factor": 1.0,
-        "reason": "Default — no override applied",
+    soil = None
+    if soil_pct is not None:
+        try:
+            soil = float(soil_pct)
+        except Exception:
+            pass
+
+    action, factor, reason = _verdict(precip_24, pop, soil, temp_f, wind, cfg)
+    return {
+        "action": action,
+        "duration_factor": factor,
+        "reason": reason,
         "details": {
             "precip_24_mm": precip_24,
             "pop": pop,
@@ -85,93 +148,76 @@ def decide_override(snapshot: Dict[str, Any], config: Dict[str, Any] = None) ->
         }
     }
 
-    # 1) Skip if there was significant rain recently
-    if precip_24 >= cfg["min_precip_skip_mm"]:
-        decision.update({
-            "action": "skip",
-            "duration_factor": 0.0,
-            "reason": f"Recent rainfall {precip_24:.1f} mm >= {cfg['min_precip_skip_mm']} mm — skipping watering."
-        })
-        return decision
 
-    # 2) Skip if soil moisture sensor indicates already wet
-    if soil_pct is not None:
-        try:
-            soil_pct = float(soil_pct)
-            if soil_pct >= cfg["soil_moisture_high_pct"]:
-                decision.update({
-                    "action": "skip",
-                    "duration_factor": 0.0,
-                    "reason": f"Soil moisture {soil_pct:.0f}% >= {cfg['soil_moisture_high_pct']}% — skipping watering."
-                })
-                return decision
-        except Exception:
-            pass
+def _as_float(v) -> float:
+    try:
+        return float(v)
+    except Exception:  # None / unparsable sensor value -> never matches a rule
+        return np.nan
 
-    # 3) Skip if high probability of rain in next window
-    if pop >= cfg["pop_skip_threshold"]:
-        decision.update({
-            "action": "skip",
-            "duration_factor": 0.0,
-            "reason": f"Chance of precipitation {pop}% >= {cfg['pop_skip_threshold']}% — skipping scheduled run."
-        })
-        return decision
 
-    # 4) Reduce if wind is too high (to avoid evaporative loss and uneven coverage)
-    if wind >= cfg["wind_cutoff_kph"]:
-        decision.update({
-            "action": "reduce",
-            "duration_factor": max(cfg["max_reduce_factor"], 0.3),
-            "reason": f"High wind {wind} kph >= {cfg['wind_cutoff_kph']} kph — reducing duration to limit waste."
-        })
-        return decision
+def _column(values: list) -> np.ndarray:
+    try:
+        return np.array(values, dtype=float)  # None -> NaN, numeric strings parsed
+    except (TypeError, ValueError):
+        return np.fromiter(map(_as_float, values), float, len(values))
 
-    # 5) Temperature-driven adjustments (hot weather -> increase)
-    if temp_f is not None:
-        if temp_f >= cfg["very_hot_temp_f"]:
-            decision.update({
-                "action": "increase",
-                "duration_factor": cfg["max_increase_factor"],
-                "reason": f"Very hot {temp_f}°F >= {cfg['very_hot_temp_f']}°F — increasing duration."
-            })
-            return decision
-        if temp_f >= cfg["hot_temp_f"]:
-            # small bump for hot but not extreme
-            decision.update({
-                "action": "increase",
-                "duration_factor": min(1.25, cfg["max_increase_factor"]),
-                "reason": f"Hot {temp_f}°F >= {cfg['hot_temp_f']}°F — moderate increase to avoid heat stress."
-            })
-            return decision
 
-    # 6) If soil is very dry, consider slight increase
-    if soil_pct is not None:
-        try:
-            soil_pct = float(soil_pct)
-            if soil_pct <= cfg["soil_moisture_low_pct"]:
-                factor = min(1.25, cfg["max_increase_factor"])
-                decision.update({
-                    "action": "increase",
-                    "duration_factor": factor,
-                    "reason": f"Soil moisture low ({soil_pct:.0f}%) <= {cfg['soil_moisture_low_pct']}% — increasing duration."
-                })
-                return decision
-        except Exception:
-            pass
+BATCH_DTYPE = np.dtype([("action", "U8"), ("duration_factor", "f8")])
+_BATCH_ACTIONS = np.array(["skip", "skip", "skip", "reduce", "increase", "increase", "increase", "reduce", "normal"])
+_LIGHT_RAIN = 7  # rule index whose factor scales with the rain that fell
 
-    # 7) If light precipitation occurred but not enough to skip, reduce
-    if 0 < precip_24 < cfg["min_precip_skip_mm"]:
-        small_reduce = max(0.6, 1.0 - (precip_24 / (cfg["min_precip_skip_mm"] * 2)))
-        decision.update({
-            "action": "reduce",
-            "duration_factor": small_reduce,
-            "reason": f"Light recent precipitation ({precip_24:.1f} mm) — reducing duration proportionally."
-        })
-        return decision
 
-    # default: normal
-    decision.update({"action": "normal", "duration_factor": 1.0, "reason": "Conditions normal."})
-    return decision
+def decide_override_arrays(precip, pop, soil, temp, wind, config: Dict[str, Any] = None) -> np.ndarray:
+    """
+    decide_override_batch() for data that is already columnar: one float array
+    per field (precip = mm in the last 24h), NaN where a value is missing.
+    """
+    cfg = {**DEFAULT_CONFIG, **config} if config else DEFAULT_CONFIG
+    precip, pop, soil, temp, wind = (np.ascontiguousarray(x, dtype=np.float64)
+                                     for x in (precip, pop, soil, temp, wind))
+    min_skip = cfg["min_precip_skip_mm"]
+    bump = min(1.25, cfg["max_increase_factor"])
+    factors = np.array([0.0, 0.0, 0.0, max(cfg["max_reduce_factor"], 0.3), cfg["max_increase_factor"],
+                        bump, bump, np.nan, 1.0])
+
+    # same priority order as decide_override; np.select takes the first true mask
+    masks = [
+        precip >= min_skip,
+        soil >= cfg["soil_moisture_high_pct"],
+        pop >= cfg["pop_skip_threshold"],
+        wind >= cfg["wind_cutoff_kph"],
+        temp >= cfg["very_hot_temp_f"],
+        temp >= cfg["hot_temp_f"],
+        soil <= cfg["soil_moisture_low_pct"],
+        (precip > 0) & (precip < min_skip),
+    ]
+    rule = np.select(masks, np.arange(len(masks)), default=len(masks))  # index of the winning rule
+
+    out = np.empty(precip.size, BATCH_DTYPE)
+    out["action"] = _BATCH_ACTIONS[rule]
+    out["duration_factor"] = factors[rule]
+    light = rule == _LIGHT_RAIN
+    out["duration_factor"][light] = np.maximum(0.6, 1.0 - precip[light] / (min_skip * 2))
+    return out
+
+
+def decide_override_batch(snapshots: List[Dict[str, Any]], config: Dict[str, Any] = None) -> np.ndarray:
+    """
+    decide_override() for many snapshots at once (simulations, backfills).
+
+    Returns a structured array with "action" and "duration_factor" per snapshot,
+    the same values decide_override() gives; use that for the reason text.
+    Fields are stacked into arrays and every rule is one vectorized comparison;
+    missing or unparsable values become NaN, which no threshold matches.
+    """
+    return decide_override_arrays(
+        _column([s.get("precip_mm_24h") or s.get("precip_today_mm") or 0.0 for s in snapshots]),
+        _column([s.get("pop", 0) for s in snapshots]),
+        _column([s.get("soil_moisture_pct") for s in snapshots]),
+        _column([s.get("temp_f") for s in snapshots]),
+        _column([s.get("wind_kph", 0.0) for s in snapshots]),
+        config)
 
 
 # Example small helper to apply decision to a planned duration
@@ -2,27 +2,35 @@
 from ultralytics import YOLO
 import cv2
 import numpy as np
+import torch
+from pathlib import Path
 
-# Load your trained YOLOv8 model
-model = YOLO("best.pt")  # <-- change this to your actual .pt path
+# Load your trained YOLOv8 model. A TensorRT engine next to it is used when
+# present (build once: python build_trt_engine.py --weights best.pt --out best.engine);
+# otherwise the .pt runs in FP16 on a GPU. Keep this one instance for every frame.
+WEIGHTS = Path("best.pt")  # <-- change this to your actual .pt path
+ENGINE = WEIGHTS.with_suffix(".engine")
+model = YOLO(str(ENGINE), task="detect") if ENGINE.exists() else YOLO(str(WEIGHTS))
+HALF = torch.cuda.is_available()
 
 # Read a test image (or capture from camera)
 frame = cv2.imread("test_image.jpg")  # change path to your test image
 
 # Run inference
-results = model(frame)[0]
+results = model.predict(frame, imgsz=640, half=HALF, verbose=False)[0]
 
-# Initialize counters
 h, w = frame.shape[:2]
-areas = {"grass": 0.0, "water": 0.0, "dead_grass": 0.0}
 
-# Count detected object areas
-for box, cls in zip(results.boxes.xyxy.cpu().numpy(), results.boxes.cls.cpu().numpy()):
-    x1, y1, x2, y2 = box[:4]
-    area = max(0, (x2 - x1) * (y2 - y1))
-    label = model.names[int(cls)]
-    if label in areas:
-        areas[label] += area
+# Sum detected box areas per class on the device the boxes are on;
+# only the per-class totals are copied back
+b = results.boxes.xyxy
+box_areas = ((b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])).clamp(min=0)
+per_class = torch.bincount(results.boxes.cls.long(), weights=box_areas,
+                           minlength=len(model.names)).cpu().numpy()
+areas = {"grass": 0.0, "water": 0.0, "dead_grass": 0.0}
+for i, name in model.names.items():
+    if name in areas:
+        areas[name] += float(per_class[i])
 
 total_area = w * h
 grass_frac = areas["grass"] / total_area